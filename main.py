@@ -1,16 +1,37 @@
 import argparse
-import yaml
 from typing import Dict, Any
 
-def load_config(config_path: str) -> Dict[str, Any]:
-    with open(config_path, 'r') as file:
-        return yaml.safe_load(file)
+from src.utils.config import load_config
+
+
+def _run_backtest_mode(config: Dict[str, Any], args: argparse.Namespace) -> None:
+    """生成模拟数据并运行回测"""
+    from run_backtest import run_backtest, wait_for_plots
+    run_backtest(config, fast=args.fast)
+    wait_for_plots()
+
+
+def _run_optimize_mode(config: Dict[str, Any], args: argparse.Namespace) -> None:
+    """运行策略参数优化"""
+    from run_optimization import run_optimization
+    strategy_type = config['strategies']['type']
+    run_optimization(config, strategy_type,
+                     force_optimize=args.force_optimize,
+                     apply_best=args.apply_best)
+
+
+# 运行模式 -> 处理函数，各处理函数内部按需导入对应模块
+MODE_HANDLERS = {
+    'backtest': _run_backtest_mode,
+    'optimize': _run_optimize_mode,
+}
+
 
 def main():
     parser = argparse.ArgumentParser(description='AutoBt - 自动化回测系统')
     parser.add_argument('--config', type=str, default='config/config.yaml',
                         help='配置文件路径')
-    parser.add_argument('--mode', type=str, choices=['backtest', 'optimize'], default='backtest',
+    parser.add_argument('--mode', type=str, choices=list(MODE_HANDLERS), default='backtest',
                         help='运行模式: backtest或optimize')
     parser.add_argument('--data-generator', type=str, 
                         choices=['monte_carlo', 'garch', 'regime', 'extreme', 'multi_asset', 'stress_test'],
@@ -27,6 +48,8 @@ def main():
                         help='优化使用的性能指标')
     parser.add_argument('--trials', type=int,
                         help='优化试验次数')
+    parser.add_argument('--fast', action='store_true',
+                        help='使用向量化信号 + Numba快速回测核心，不经过Cerebro')
     args = parser.parse_args()
     
     config = load_config(args.config)
@@ -53,17 +76,8 @@ def main():
         config['optimization']['trials'] = args.trials
         print(f"使用命令行指定的优化试验次数: {args.trials}")
     
-    if args.mode == 'backtest':
-        # 生成模拟数据并运行回测
-        from run_backtest import run_backtest
-        run_backtest(config)
-    else:
-        # 运行策略参数优化
-        from run_optimization import run_optimization
-        strategy_type = config['strategies']['type']
-        run_optimization(config, strategy_type, 
-                         force_optimize=args.force_optimize, 
-                         apply_best=args.apply_best)
+    # 按运行模式分发
+    MODE_HANDLERS[args.mode](config, args)
 
 if __name__ == '__main__':
     main()
@@ -1,11 +1,34 @@
 import backtrader as bt
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, Any, Type, List
+from concurrent.futures import Future, ProcessPoolExecutor
+from types import SimpleNamespace
+from typing import Dict, Any, Callable, Type, List, Optional
 
-from src.data_generators.base import BaseDataGenerator
-from src.utils.metrics import calculate_metrics
-from src.utils.visualizer import plot_equity_curve, plot_drawdown
+from src.backtest.analyzers import FastEquityAnalyzer, PruningAnalyzer
+from src.backtest.fast_core import simulate_with_checkpoints
+from src.data_generators import DATA_GENERATOR_REGISTRY, BaseDataGenerator, MonteCarloGenerator
+from src.strategies import STRATEGY_REGISTRY, SampleStrategy, silence_strategy_log
+from src.utils.config import load_config
+from src.utils.metrics import PERIODS_PER_YEAR, calculate_metrics
+
+
+# 交易统计的取值函数在导入时绑定，汇总结果时不再逐段解析属性路径。
+# 没有交易时TradeAnalyzer的结果中不存在 won/lost 等键 (已关闭自动创建，访问抛出KeyError)
+TRADE_COUNT_GETTERS: Dict[str, Callable[[Any], int]] = {
+    'num_trades': lambda analysis: analysis['total']['total'],
+    'winning_trades': lambda analysis: analysis['won']['total'],
+    'losing_trades': lambda analysis: analysis['lost']['total'],
+}
+
+
+def _try_get(getter: Callable[[Any], Any], analysis: Any, default: Any = 0) -> Any:
+    """从分析结果中取值，字段不存在时返回默认值"""
+    try:
+        return getter(analysis)
+    except (KeyError, AttributeError, TypeError):
+        return default
 
 
 def get_data_generator(config: Dict[str, Any]) -> BaseDataGenerator:
@@ -13,28 +36,11 @@ def get_data_generator(config: Dict[str, Any]) -> BaseDataGenerator:
     generator_type = config.get('data_generator', {}).get('type', 'monte_carlo') # Default to monte_carlo
     data_config = config.get('data_generator', {})
 
-    if generator_type == 'monte_carlo':
-        from src.data_generators.monte_carlo import MonteCarloGenerator
-        return MonteCarloGenerator(data_config)
-    elif generator_type == 'garch':
-        from src.data_generators.garch import GARCHGenerator
-        return GARCHGenerator(data_config)
-    elif generator_type == 'extreme':
-        from src.data_generators.extreme import ExtremeEventGenerator
-        return ExtremeEventGenerator(data_config)
-    elif generator_type == 'regime':
-        from src.data_generators.regime import RegimeSwitchingGenerator
-        return RegimeSwitchingGenerator(data_config)
-    elif generator_type == 'multi_asset':
-        from src.data_generators.multi_asset import MultiAssetGenerator
-        return MultiAssetGenerator(data_config)
-    elif generator_type == 'stress_test':
-        from src.data_generators.stress_test import StressTestGenerator
-        return StressTestGenerator(data_config)
-    else:
+    generator_cls = DATA_GENERATOR_REGISTRY.get(generator_type)
+    if generator_cls is None:
         print(f"未知的模拟数据生成器类型: {generator_type}，使用默认的monte_carlo")
-        from src.data_generators.monte_carlo import MonteCarloGenerator
-        return MonteCarloGenerator(data_config)
+        generator_cls = MonteCarloGenerator
+    return generator_cls(data_config)
 
 def get_strategy_class(config: Dict[str, Any]) -> Type[bt.Strategy]:
     """
@@ -48,31 +54,196 @@ def get_strategy_class(config: Dict[str, Any]) -> Type[bt.Strategy]:
     """
     strategy_type = config.get('strategies', {}).get('type', 'SampleStrategy')
     
-    if strategy_type == 'SampleStrategy':
-        from src.strategies.sample_strategy import SampleStrategy
-        return SampleStrategy
-    elif strategy_type == 'DualMovingAverageStrategy':
-        from src.strategies.dual_moving_average_strategy import DualMovingAverageStrategy
-        return DualMovingAverageStrategy
-    elif strategy_type == 'MeanReversionStrategy':
-        from src.strategies.mean_reversion_strategy import MeanReversionStrategy
-        return MeanReversionStrategy
-    elif strategy_type == 'MomentumStrategy':
-        from src.strategies.momentum_strategy import MomentumStrategy
-        return MomentumStrategy
-    else:
+    strategy_cls = STRATEGY_REGISTRY.get(strategy_type)
+    if strategy_cls is None:
         print(f"未知的策略类型: {strategy_type}，使用默认SampleStrategy")
-        from src.strategies.sample_strategy import SampleStrategy
-        return SampleStrategy
+        strategy_cls = SampleStrategy
+    return strategy_cls
+
+def _backtest_settings(config: Dict[str, Any]) -> SimpleNamespace:
+    """
+    回测开始时一次性读取用到的配置项，回测过程中不再逐层 config.get(...).get(...) 查找
+
+    参数:
+        config: 配置字典
+
+    返回:
+        扁平的配置命名空间
+    """
+    strategies_config = config.get('strategies', {})
+    backtest_config = config.get('backtest', {})
+    strategy_type = strategies_config.get('type', 'SampleStrategy')
+    freq = config.get('data_generator', {}).get('frequency', 'D')
+    return SimpleNamespace(
+        strategy_type=strategy_type,
+        strategy_params=strategies_config.get(strategy_type, {}),
+        cash=backtest_config.get('cash', 100000.0),
+        commission=backtest_config.get('commission', 0.001),
+        periods_per_year=PERIODS_PER_YEAR.get(freq, 252),
+        metric=config.get('optimization', {}).get('metric', 'sharpe_ratio'),
+    )
+
+def _result_path(results_dir: Optional[str], filename: str) -> Optional[str]:
+    """结果文件的保存路径，results_dir为None时返回None (不保存)"""
+    return os.path.join(results_dir, filename) if results_dir is not None else None
+
+# 后台绘图进程池 (首次需要保存图表时创建) 和尚未完成的绘图任务
+_PLOT_POOL: Optional[ProcessPoolExecutor] = None
+_PLOT_FUTURES: List[Future] = []
+
+def _init_plot_worker() -> None:
+    """后台绘图进程只保存图片，使用非交互的Agg后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _render_performance_plots(equity: np.ndarray, dates: np.ndarray, strategy_type: str,
+                              results_dir: Optional[str]) -> None:
+    """绘制权益曲线和回撤图表，只接收数组，提交到后台进程时无需序列化Cerebro等对象"""
+    from src.utils.visualizer import plot_equity_curve, plot_drawdown
+    portfolio_values = pd.Series(equity, index=pd.DatetimeIndex(dates))
+    try:
+        plot_equity_curve(portfolio_values, title=f"权益曲线 - {strategy_type}",
+                         save_path=_result_path(results_dir, f"{strategy_type}_equity_curve.png"))
+        plot_drawdown(portfolio_values, title=f"回撤 - {strategy_type}",
+                     save_path=_result_path(results_dir, f"{strategy_type}_drawdown.png"))
+    except Exception as e:
+        print(f"绘制性能图表时出错: {e}")
+
+def _submit_performance_plots(portfolio_values: pd.Series, strategy_type: str,
+                              results_dir: Optional[str]) -> Optional[Future]:
+    """
+    绘制权益曲线和回撤图表
+
+    保存到results_dir时提交到后台进程绘制，回测无需等待matplotlib渲染；
+    results_dir为None (弹窗显示) 时在当前进程中同步绘制。
+
+    返回:
+        后台绘图任务的Future，同步绘制时为None
+    """
+    global _PLOT_POOL
+    equity = portfolio_values.to_numpy(dtype=np.float64)
+    dates = portfolio_values.index.to_numpy()
+    if results_dir is None:
+        _render_performance_plots(equity, dates, strategy_type, results_dir)
+        return None
+
+    if _PLOT_POOL is None:
+        _PLOT_POOL = ProcessPoolExecutor(max_workers=1, initializer=_init_plot_worker)
+    future = _PLOT_POOL.submit(_render_performance_plots, equity, dates, strategy_type, results_dir)
+    _PLOT_FUTURES.append(future)
+    return future
+
+def wait_for_plots() -> None:
+    """等待所有后台绘图任务完成 (进程退出时也会自动等待)"""
+    while _PLOT_FUTURES:
+        _PLOT_FUTURES.pop(0).result()
+
+def _run_fast_backtest(cfg: SimpleNamespace, StrategyClass: Type[bt.Strategy], simulated_data_df: pd.DataFrame,
+                       data_generator: BaseDataGenerator, plot: bool, results_dir: Optional[str],
+                       trial: Optional[Any] = None, verbose: bool = True) -> Dict[str, Any]:
+    """
+    使用策略的向量化信号 (compute_signals) 和Numba编译的回测核心执行回测，不经过Cerebro和分析器
+
+    参数:
+        cfg: 回测配置 (见 _backtest_settings)
+        StrategyClass: 策略类
+        simulated_data_df: 模拟数据
+        data_generator: 生成该数据的数据生成器
+        plot: 是否绘制权益和回撤图表
+        results_dir: 保存结果图表的目录
+        trial: 可选的Optuna trial，提供时在检查点报告阶段性指标并支持剪枝
+        verbose: 是否打印回测过程和结果
+
+    返回:
+        回测结果字典，字段与Cerebro路径一致
+    """
+    strategy_type = cfg.strategy_type
+    strategy_params = dict(StrategyClass.params._getitems())
+    strategy_params.update(cfg.strategy_params)
+    if verbose:
+        print(f"策略参数: {strategy_params}")
+
+    # 多资产数据与Cerebro路径一致，只交易第一个资产
+    asset_names = getattr(data_generator, 'asset_names', None)
+    prefix = f"{asset_names[0]}_" if asset_names else ''
+    close = simulated_data_df[f'{prefix}close'].to_numpy(dtype=np.float64)
+    open_ = simulated_data_df[f'{prefix}open'].to_numpy(dtype=np.float64) if f'{prefix}open' in simulated_data_df else close
+
+    entries, exits = StrategyClass.compute_signals(close, strategy_params)
+    initial_cash = cfg.cash
+    periods_per_year = cfg.periods_per_year
+
+    on_checkpoint = None
+    if trial is not None:
+        metric = cfg.metric
+
+        def on_checkpoint(step: int, equity_so_far: np.ndarray) -> bool:
+            # 以截至当前的组合价值计算优化指标并报告，返回剪枝器的判定
+            value = calculate_metrics(equity_so_far, periods_per_year=periods_per_year).get(metric)
+            if value is None or not np.isfinite(value):
+                return False
+            trial.report(value, step)
+            return trial.should_prune()
+
+    if verbose:
+        print(f"开始快速回测策略: {strategy_type}...")
+    equity, num_trades, winning_trades, losing_trades = simulate_with_checkpoints(
+        open_, close, entries, exits,
+        float(initial_cash),
+        float(cfg.commission),
+        float(strategy_params['order_percentage']),
+        float(strategy_params['stop_loss']),
+        float(strategy_params.get('trailing_stop', 0.0)),
+        on_checkpoint=on_checkpoint
+    )
+    if equity.size < close.size:
+        import optuna
+        raise optuna.TrialPruned(f"在完成 {100 * equity.size // close.size}% 的bar时被剪枝")
+    final_value = float(equity[-1])
+    if verbose:
+        print(f"回测完成. 最终组合价值: {final_value:.2f}")
+
+    portfolio_values = pd.Series(equity, index=simulated_data_df.index)
+
+    analysis_results = {
+        'initial_cash': initial_cash,
+        'final_value': final_value,
+        'total_return_abs': final_value - initial_cash,
+        'total_return_pct': (final_value / initial_cash - 1) * 100,
+        'num_trades': num_trades,
+        'winning_trades': winning_trades,
+        'losing_trades': losing_trades,
+    }
+    analysis_results.update(calculate_metrics(portfolio_values, periods_per_year=periods_per_year))
+
+    if verbose:
+        print("\n--- 回测结果 ---")
+        for key, value in analysis_results.items():
+            print(f"{key}: {value}")
+        print("-----------------")
+
+    if plot:
+        if results_dir is not None:
+            os.makedirs(results_dir, exist_ok=True)
+        _submit_performance_plots(portfolio_values, strategy_type, results_dir)
+
+    return analysis_results
 
-def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: str = 'results') -> Dict[str, Any]:
+def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: Optional[str] = 'results',
+                 precomputed_data: Optional[pd.DataFrame] = None, fast: bool = False,
+                 trial: Optional[Any] = None, verbose: bool = True) -> Dict[str, Any]:
     """
     执行回测
     
     参数:
         config: 配置字典
         plot: 是否绘制结果图表
-        results_dir: 保存结果图表的目录
+        results_dir: 保存结果图表的目录，为None时不创建目录也不保存图表
+        precomputed_data: 可选，预先生成的模拟数据；未提供时按数据生成配置生成 (带缓存)
+        fast: 是否使用Numba快速回测核心 (策略需提供 compute_signals，否则仍使用Cerebro)
+        trial: 可选的Optuna trial，提供时每完成约10%的bar报告一次优化指标，
+               被剪枝器判定剪枝时抛出 optuna.TrialPruned
+        verbose: 是否打印回测过程和结果，批量回测/参数优化时可关闭以减少输出
         
     返回:
         回测结果字典
@@ -82,121 +253,120 @@ def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: str = '
         config['strategies'] = {}
     if 'type' not in config['strategies']:
         config['strategies']['type'] = 'SampleStrategy'
+    cfg = _backtest_settings(config)
+    StrategyClass = get_strategy_class(config)
     
     # 生成模拟数据
     data_generator = get_data_generator(config)
-    simulated_data_df = data_generator.generate()
+    if precomputed_data is not None:
+        simulated_data_df = precomputed_data.copy()
+    else:
+        simulated_data_df = data_generator.generate_cached()
+
+    if fast:
+        if hasattr(StrategyClass, 'compute_signals'):
+            return _run_fast_backtest(cfg, StrategyClass, simulated_data_df, data_generator, plot, results_dir,
+                                      trial, verbose)
+        if verbose:
+            print(f"策略 {cfg.strategy_type} 不支持快速回测，使用Cerebro回测")
+
     bt_data_feed = data_generator.to_bt_feed(simulated_data_df)
 
     # 创建Cerebro引擎并添加数据
-    cerebro = bt.Cerebro()
+    # 默认的标准观察者 (Broker/Trades/BuySell) 同样只用于绘图，不绘图时一并关闭
+    cerebro = bt.Cerebro(stdstats=plot)
     
     # 处理数据源，支持单个数据源或数据源列表
     if isinstance(bt_data_feed, list):
         # 如果是数据源列表（多资产情况），添加所有数据源
         for data in bt_data_feed:
             cerebro.adddata(data)
-        print(f"添加了 {len(bt_data_feed)} 个资产数据源")
+        if verbose:
+            print(f"添加了 {len(bt_data_feed)} 个资产数据源")
     else:
         # 单个数据源
         cerebro.adddata(bt_data_feed)
     
-    # 添加一个观察者来跟踪投资组合价值
-    cerebro.addobserver(bt.observers.Value)
-    cerebro.addobserver(bt.observers.DrawDown)
+    # 观察者只用于cerebro.plot()绘图，不绘图时不添加以省去每根bar的记录开销
+    if plot:
+        cerebro.addobserver(bt.observers.Value)
+        cerebro.addobserver(bt.observers.DrawDown)
 
     # 添加策略
-    StrategyClass = get_strategy_class(config)
-    strategy_type = config['strategies']['type']
-    strategy_params = config.get('strategies', {}).get(strategy_type, {})
-    print(f"策略参数: {strategy_params}")
+    strategy_type = cfg.strategy_type
+    strategy_params = cfg.strategy_params
+    if verbose:
+        print(f"策略参数: {strategy_params}")
     cerebro.addstrategy(StrategyClass, **strategy_params)
     
     # 设置初始资金和手续费
-    backtest_config = config.get('backtest', {})
-    cerebro.broker.setcash(backtest_config.get('cash', 100000.0))
-    cerebro.broker.setcommission(commission=backtest_config.get('commission', 0.001))
+    cerebro.broker.setcash(cfg.cash)
+    cerebro.broker.setcommission(commission=cfg.commission)
 
-    # 添加分析器
-    cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe')
-    cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-    cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+    # 添加分析器 (夏普比率、回撤、收益等指标由 calculate_metrics 基于组合价值一次性计算)
     cerebro.addanalyzer(bt.analyzers.TradeAnalyzer, _name='tradeanalyzer')
-    cerebro.addanalyzer(bt.analyzers.PyFolio, _name='pyfolio')
+    cerebro.addanalyzer(FastEquityAnalyzer, _name='equity')
+    if trial is not None:
+        cerebro.addanalyzer(PruningAnalyzer, _name='pruning', trial=trial, metric=cfg.metric,
+                            total_bars=len(simulated_data_df), periods_per_year=cfg.periods_per_year)
 
     # 运行回测
-    print(f"开始回测策略: {strategy_type}...")
-    results = cerebro.run()
-    print(f"回测完成. 最终组合价值: {cerebro.broker.getvalue():.2f}")
+    if verbose:
+        print(f"开始回测策略: {strategy_type}...")
+    if verbose:
+        results = cerebro.run()
+    else:
+        # 不输出回测过程时一并关闭策略的逐笔交易日志
+        with silence_strategy_log(StrategyClass):
+            results = cerebro.run()
+    if verbose:
+        print(f"回测完成. 最终组合价值: {cerebro.broker.getvalue():.2f}")
 
-    # 创建结果目录
-    os.makedirs(results_dir, exist_ok=True)
-    
     # 获取回测结果
     strat = results[0]
     
-    # 安全地获取分析结果
-    def safe_get(analyzer, attr_path, default=0):
-        try:
-            result = analyzer.get_analysis()
-            for attr in attr_path.split('.'):
-                if hasattr(result, attr):
-                    result = getattr(result, attr)
-                elif isinstance(result, dict) and attr in result:
-                    result = result[attr]
-                else:
-                    return default
-            return result
-        except Exception as e:
-            print(f"获取分析结果时出错: {e}")
-            return default
+    # 每个分析器的 get_analysis() 只调用一次，后续构建组合价值和汇总结果时复用
+    trade_analysis = strat.analyzers.tradeanalyzer.get_analysis()
+    equity_analysis = strat.analyzers.equity.get_analysis() if hasattr(strat.analyzers, 'equity') else None
     
     # 获取投资组合价值
     try:
         # 创建直接的日线价值序列
-        initial_cash = backtest_config.get('cash', 100000.0)
+        initial_cash = cfg.cash
         final_value = cerebro.broker.getvalue()
         
         # 首先尝试从analyzers获取每日价值
-        if hasattr(strat.analyzers, 'pyfolio'):
-            pyfolio = strat.analyzers.getbyname('pyfolio')
-            # 检查是否有portfolio_value
-            pyfolio_analysis = pyfolio.get_analysis()
-            if pyfolio_analysis and 'returns' in pyfolio_analysis and len(pyfolio_analysis['returns']) > 0:
-                # 获取收益率，然后计算投资组合价值
-                rets = pd.Series(pyfolio_analysis['returns'])
-                # 从初始值开始累积
-                portfolio_values = initial_cash * (1 + rets).cumprod()
-                portfolio_values.index = pd.DatetimeIndex(pyfolio_analysis['returns'].keys())
+        if equity_analysis is not None:
+            if len(equity_analysis['equity']) > 0:
+                # 分析器已按bar记录组合价值和日期，直接构建序列
+                portfolio_values = pd.Series(equity_analysis['equity'],
+                                             index=pd.DatetimeIndex(equity_analysis['dt']), copy=False)
             else:
-                # 如果无法获取收益率，尝试获取交易日期和价值
-                print("警告: 无法从pyfolio获取收益率，尝试构建简化的价值序列")
+                # 如果没有记录到组合价值，尝试获取交易日期和价值
+                print("警告: 未记录到组合价值，尝试构建简化的价值序列")
                 # 获取交易日期
                 trade_dates = []
                 trade_values = []
                 
                 # 从交易分析器获取交易日期
-                if hasattr(strat.analyzers, 'tradeanalyzer'):
-                    analyzer = strat.analyzers.getbyname('tradeanalyzer')
-                    analysis = analyzer.get_analysis()
+                if trade_analysis is not None:
+                    analysis = trade_analysis
                     
                     # 至少需要初始日期和最终日期
                     trade_dates = [simulated_data_df.index[0]]
                     trade_values = [initial_cash]
                     
-                    # 添加每笔交易的日期和价值变化
+                    # 添加每笔交易的日期和价值变化: 先一次性取出有平仓日期的交易，
+                    # 日期整体转换一次，价值为初始资金加累计净利润 (粗略估计)
                     if 'closed' in analysis and analysis['closed'] > 0:
-                        for trade_num in range(analysis['closed']):
-                            if f'trade{trade_num}' in analysis:
-                                trade = analysis[f'trade{trade_num}']
-                                if 'dtout' in trade:  # 平仓日期
-                                    date = trade['dtout']
-                                    if isinstance(date, str):
-                                        date = pd.to_datetime(date)
-                                    trade_dates.append(date)
-                                    # 使用粗略的价值估计
-                                    value = trade_values[-1] + trade.get('pnlcomm', 0)
-                                    trade_values.append(value)
+                        trades = [analysis[f'trade{trade_num}'] for trade_num in range(analysis['closed'])
+                                  if f'trade{trade_num}' in analysis]
+                        trades = [trade for trade in trades if 'dtout' in trade]
+                        if trades:
+                            pnls = np.fromiter((trade.get('pnlcomm', 0) for trade in trades),
+                                               dtype=np.float64, count=len(trades))
+                            trade_dates.extend(pd.to_datetime([trade['dtout'] for trade in trades]))
+                            trade_values.extend(initial_cash + np.cumsum(pnls))
                 
                 # 添加最终日期和价值
                 if trade_dates and trade_dates[-1] != simulated_data_df.index[-1]:
@@ -215,7 +385,7 @@ def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: str = '
                         index=[simulated_data_df.index[0], simulated_data_df.index[-1]]
                     )
         else:
-            print("警告: 找不到pyfolio分析器，使用简化的投资组合价值序列")
+            print("警告: 找不到组合价值分析器，使用简化的投资组合价值序列")
             portfolio_values = pd.Series(
                 [initial_cash, final_value], 
                 index=[simulated_data_df.index[0], simulated_data_df.index[-1]]
@@ -223,7 +393,7 @@ def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: str = '
     except Exception as e:
         print(f"处理投资组合价值时出错: {e}")
         print("使用简化的投资组合价值序列")
-        initial_cash = backtest_config.get('cash', 100000.0)
+        initial_cash = cfg.cash
         final_value = cerebro.broker.getvalue()
         portfolio_values = pd.Series(
             [initial_cash, final_value], 
@@ -231,11 +401,7 @@ def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: str = '
         )
     
     # 计算绩效指标
-    freq = config.get('data_generator', {}).get('frequency', 'D')
-    periods_map = {'D': 252, 'H': 252*24, 'M': 252*24*60}
-    periods_per_year = periods_map.get(freq, 252)
-    
-    calculated_metrics = calculate_metrics(portfolio_values, periods_per_year=periods_per_year)
+    calculated_metrics = calculate_metrics(portfolio_values, periods_per_year=cfg.periods_per_year)
     
     # 汇总结果
     analysis_results = {
@@ -243,39 +409,34 @@ def run_backtest(config: Dict[str, Any], plot: bool = True, results_dir: str = '
         'final_value': final_value,
         'total_return_abs': final_value - initial_cash,
         'total_return_pct': (final_value / initial_cash - 1) * 100,
-        'sharpe_ratio': safe_get(strat.analyzers.sharpe, 'sharperatio'),
-        'max_drawdown': safe_get(strat.analyzers.drawdown, 'max.drawdown'),
-        'num_trades': safe_get(strat.analyzers.tradeanalyzer, 'total.total'),
-        'winning_trades': safe_get(strat.analyzers.tradeanalyzer, 'won.total'),
-        'losing_trades': safe_get(strat.analyzers.tradeanalyzer, 'lost.total'),
     }
+    analysis_results.update({key: _try_get(getter, trade_analysis) for key, getter in TRADE_COUNT_GETTERS.items()})
     analysis_results.update(calculated_metrics)
 
     # 打印结果
-    print("\n--- 回测结果 ---")
-    for key, value in analysis_results.items():
-        print(f"{key}: {value}")
-    print("-----------------")
+    if verbose:
+        print("\n--- 回测结果 ---")
+        for key, value in analysis_results.items():
+            print(f"{key}: {value}")
+        print("-----------------")
 
     # 绘图
     if plot:
+        if results_dir is not None:
+            os.makedirs(results_dir, exist_ok=True)
+        # 先提交权益/回撤图表，后台进程绘制的同时在当前进程中显示backtrader图表
+        _submit_performance_plots(portfolio_values, strategy_type, results_dir)
+
+        # 必须先于cerebro.plot()导入: backtrader绘图模块会在pyplot未加载时强制切换到TkAgg后端
+        import src.utils.visualizer  # noqa: F401
         try:
             cerebro.plot()
         except Exception as e:
             print(f"绘制backtrader图表时出错: {e}")
-        
-        try:
-            plot_equity_curve(portfolio_values, title=f"权益曲线 - {strategy_type}", 
-                             save_path=os.path.join(results_dir, f"{strategy_type}_equity_curve.png"))
-            plot_drawdown(portfolio_values, title=f"回撤 - {strategy_type}", 
-                         save_path=os.path.join(results_dir, f"{strategy_type}_drawdown.png"))
-        except Exception as e:
-            print(f"绘制性能图表时出错: {e}")
 
     return analysis_results
 
 if __name__ == '__main__':
-    import yaml
     config_path = 'config/config.yaml'
     
     # 查找配置文件
@@ -295,8 +456,7 @@ if __name__ == '__main__':
             config = {}
     else:
         # 加载配置
-        with open(config_path, 'r') as file:
-            config = yaml.safe_load(file)
+        config = load_config(config_path)
     
     # 设置默认值
     if 'strategies' not in config:
@@ -314,3 +474,4 @@ if __name__ == '__main__':
     results = run_backtest(config, plot=True)
     print("\n详细结果字典:")
     print(results)
+    wait_for_plots()
@@ -3,9 +3,15 @@ import pandas as pd
 import yaml
 import os
 import json
+import hashlib
+import inspect
+import optuna
 from typing import Dict, Any, Type, Tuple, Optional, List
 from src.optimizers import OptunaOptimizer
-from src.utils.visualizer import plot_optimization_results
+from src.data_generators.base import _source_digest
+from src.optimizers.optuna_optimizer import load_saved_results
+from src.strategies import STRATEGY_REGISTRY
+from src.utils.config import load_config
 
 def run_optimization(config: Dict[str, Any], strategy_name: str, force_optimize: bool = False, apply_best: bool = False) -> Dict[str, Any]:
     """
@@ -27,19 +33,36 @@ def run_optimization(config: Dict[str, Any], strategy_name: str, force_optimize:
     # 创建优化器实例
     optimizer = OptunaOptimizer(config)
     
-    # 如果强制优化，则传递特殊存储URL确保创建新的优化
-    storage_url = "sqlite:///:memory:" if force_optimize else None
+    # study名称包含相关配置的哈希，相同配置再次运行时从已有试验继续，配置变化时自然对应新的study
+    storage = get_storage(config, optimizer.results_dir)
+    study_name = get_study_name(config, strategy_name)
+    
+    if force_optimize:
+        # 强制重新优化: 删除同名study中的历史试验
+        try:
+            optuna.delete_study(study_name=study_name, storage=storage)
+            print(f"已删除已有的study: {study_name}")
+        except KeyError:
+            pass
     
     # 开始优化
-    study = optimizer.optimize(strategy_name, storage_url=storage_url)
+    study = optimizer.optimize(strategy_name, study_name=study_name, storage_url=storage)
     
     # 获取优化结果
-    results_path = os.path.join('results', f"{strategy_name}_optimization_results.json")
+    results_path = optimizer.results_path(strategy_name)
     
-    if os.path.exists(results_path):
-        # 读取保存的结果
-        with open(results_path, 'r') as f:
-            results = json.load(f)
+    if study.trials or os.path.exists(results_path):
+        if study.trials:
+            # 本次执行了优化，直接从study读取结果，避免并行时读到其他组合写入的结果文件
+            results = {
+                'metric': optimizer.metric,
+                'best_value': study.best_value,
+                'best_params': dict(study.best_trial.params),
+                'trials': len(study.trials)
+            }
+        else:
+            # 读取保存的结果
+            results = load_saved_results(results_path)
         
         best_params = results.get('best_params', {})
         best_value = results.get('best_value', 'N/A')
@@ -60,8 +83,10 @@ def run_optimization(config: Dict[str, Any], strategy_name: str, force_optimize:
         
         print(f"\n正在生成优化结果图表...")
         try:
+            from src.utils.visualizer import plot_optimization_results
             plot_optimization_results(study, param_names, metric_name=metric_name, 
-                                    save_path=f'results/{strategy_name}_optimization.png')
+                                    save_path=optimizer.results_path(strategy_name, 'optimization.png'),
+                                    max_workers=optimizer.maxcpus)
         except Exception as e:
             print(f"生成图表时出错: {e}")
         
@@ -89,6 +114,61 @@ def run_optimization(config: Dict[str, Any], strategy_name: str, force_optimize:
                 'trials': 0
             }
 
+def get_storage(config: Dict[str, Any], results_dir: str = 'results') -> optuna.storages.RDBStorage:
+    """
+    获取保存所有study的数据库存储
+
+    默认为results下的SQLite文件，多机运行时通过 optimization.storage 配置为共享的数据库URL。
+    首次连接时会建表，多个进程同时首次连接同一个新数据库会冲突，并行运行前应先在父进程中调用一次。
+
+    参数:
+        config: 配置字典
+        results_dir: 默认SQLite文件所在目录
+
+    返回:
+        Optuna RDB存储
+    """
+    storage_url = config.get('optimization', {}).get('storage') or \
+        f"sqlite:///{os.path.join(results_dir, 'optuna.db')}"
+    engine_kwargs = {}
+    if storage_url.startswith('sqlite'):
+        engine_kwargs['connect_args'] = {'timeout': 60}  # 并行worker同时写入时等待锁
+    return optuna.storages.RDBStorage(storage_url, engine_kwargs=engine_kwargs)
+
+def get_study_name(config: Dict[str, Any], strategy_name: str) -> str:
+    """
+    生成持久化study的名称: 策略名 + 影响试验结果的配置的哈希
+
+    哈希覆盖数据生成、回测和优化目标/参数空间配置，以及只在study为空时才执行的网格搜索/预筛选的设置
+    (grid_points、grid_top_k、prefilter_top_k; 已有试验的study会跳过它们，修改后必须换一个study)，
+    还包括数据生成器包和策略所在模块的源码哈希，修改生成或策略逻辑后自动使用新的study，不会与旧数据/旧逻辑的试验混在一起。
+
+    参数:
+        config: 配置字典
+        strategy_name: 策略名称
+
+    返回:
+        study名称
+    """
+    optimization_config = config.get('optimization', {})
+    strategy_source = inspect.getsource(inspect.getmodule(STRATEGY_REGISTRY[strategy_name]))
+    key = {
+        'strategy': strategy_name,
+        'data_source': _source_digest(),
+        'strategy_source': hashlib.md5(strategy_source.encode()).hexdigest(),
+        'data_generator': config.get('data_generator', {}),
+        'backtest': config.get('backtest', {}),
+        'metric': optimization_config.get('metric', 'sharpe_ratio'),
+        'direction': optimization_config.get('direction', 'maximize'),
+        'sampler': optimization_config.get('sampler', 'tpe'),
+        'param_space': optimization_config.get('param_space', {}).get(strategy_name, {}),
+        'grid_points': optimization_config.get('grid_points', 5),
+        'grid_top_k': optimization_config.get('grid_top_k', 10),
+        'prefilter_top_k': optimization_config.get('prefilter_top_k', 0),
+    }
+    digest = hashlib.md5(json.dumps(key, sort_keys=True).encode()).hexdigest()[:8]
+    return f"{strategy_name}_{digest}"
+
 def apply_best_params(config: Dict[str, Any], strategy_name: str, best_params: Dict[str, Any]) -> None:
     """
     将最优参数应用到配置文件
@@ -149,19 +229,10 @@ def get_strategy_class(config: Dict[str, Any]) -> Type[bt.Strategy]:
     """
     strategy_type = config.get('strategies', {}).get('type', 'SampleStrategy')
     
-    if strategy_type == 'SampleStrategy':
-        from src.strategies.sample_strategy import SampleStrategy
-        return SampleStrategy
-    elif strategy_type == 'DualMovingAverageStrategy':
-        from src.strategies.dual_moving_average_strategy import DualMovingAverageStrategy
-        return DualMovingAverageStrategy
-    elif strategy_type == 'MeanReversionStrategy':
-        from src.strategies.mean_reversion_strategy import MeanReversionStrategy
-        return MeanReversionStrategy
-    elif strategy_type == 'MomentumStrategy':
-        from src.strategies.momentum_strategy import MomentumStrategy
-        return MomentumStrategy
-    else:
+    # 与优化器共用同一张策略注册表，策略模块在导入时已加载
+    try:
+        return STRATEGY_REGISTRY[strategy_type]
+    except KeyError:
         raise ValueError(f"未知的策略类型: {strategy_type}")
 
 if __name__ == '__main__':
@@ -174,8 +245,7 @@ if __name__ == '__main__':
     parser.add_argument('--apply', action='store_true', help='将最优参数应用到配置文件')
     args = parser.parse_args()
     
-    with open(args.config, 'r') as file:
-        config = yaml.safe_load(file)
+    config = load_config(args.config)
     
     strategy_name = args.strategy or config.get('strategies', {}).get('type', 'SampleStrategy')
     results = run_optimization(config, strategy_name, force_optimize=args.force, apply_best=args.apply)
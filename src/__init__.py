@@ -1,11 +1,16 @@
-from . import data_generators
-from . import strategies
-from . import optimizers
-from . import utils
+import importlib
 
 __all__ = [
     'data_generators',
     'strategies',
     'optimizers',
-    'utils'
+    'utils',
+    'backtest'
 ]
+
+
+def __getattr__(name):
+    # 子包按需导入，避免 import src.xxx 时连带加载 backtrader/optuna/matplotlib
+    if name in __all__:
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,14 @@
+from .fast_core import simulate, simulate_batch, simulate_with_checkpoints, rolling_mean, rolling_std, ema, crossover
+from .analyzers import FastEquityAnalyzer, PruningAnalyzer
+
+__all__ = [
+    'simulate',
+    'simulate_batch',
+    'simulate_with_checkpoints',
+    'rolling_mean',
+    'rolling_std',
+    'ema',
+    'crossover',
+    'FastEquityAnalyzer',
+    'PruningAnalyzer'
+]
@@ -0,0 +1,78 @@
+import backtrader as bt
+import numpy as np
+
+from src.utils.metrics import calculate_metrics
+
+
+class PruningAnalyzer(bt.Analyzer):
+    """
+    在回测过程中定期向Optuna报告阶段性指标，供剪枝器提前终止表现不佳的试验
+
+    每完成约 1/n_checkpoints 的bar，用当前为止的组合价值计算一次优化指标，
+    以已完成bar的百分比 (10, 20, ..., 100) 作为step调用 trial.report，
+    若剪枝器判定需要剪枝则抛出 TrialPruned。
+    """
+    params = (
+        ('trial', None),
+        ('metric', 'sharpe_ratio'),
+        ('total_bars', 0),
+        ('n_checkpoints', 10),
+        ('periods_per_year', 252),
+    )
+
+    def start(self):
+        self._values = np.empty(max(self.p.total_bars, 1))
+        self._count = 0
+        self._next_checkpoint = 1
+
+    def next(self):
+        if self._count >= self._values.size:
+            self._values = np.resize(self._values, self._values.size * 2)
+        self._values[self._count] = self.strategy.broker.getvalue()
+        self._count += 1
+
+        if not self.p.total_bars or self._next_checkpoint > self.p.n_checkpoints:
+            return
+        if self._count * self.p.n_checkpoints < self._next_checkpoint * self.p.total_bars:
+            return
+        self._next_checkpoint += 1
+
+        value = calculate_metrics(self._values[:self._count],
+                                  periods_per_year=self.p.periods_per_year).get(self.p.metric)
+        if value is None or not np.isfinite(value):
+            return
+
+        step = 100 * self._count // self.p.total_bars
+        self.p.trial.report(value, step)
+        if self.p.trial.should_prune():
+            import optuna
+            raise optuna.TrialPruned(f"在完成 {step}% 的bar时被剪枝")
+
+
+class FastEquityAnalyzer(bt.Analyzer):
+    """
+    记录每根bar结束时的组合价值
+
+    组合价值和backtrader数值日期写入预先分配的float64数组，get_analysis() 时才一次性把日期
+    批量转换为 datetime64，替代PyFolio分析器逐bar维护的有序字典。
+    """
+
+    def start(self):
+        size = max(self.strategy.data.buflen(), 1)
+        self._values = np.empty(size)
+        self._dtnums = np.empty(size)
+        self._count = 0
+
+    def next(self):
+        if self._count >= self._values.size:
+            self._values = np.resize(self._values, self._values.size * 2)
+            self._dtnums = np.resize(self._dtnums, self._dtnums.size * 2)
+        self._values[self._count] = self.strategy.broker.getvalue()
+        self._dtnums[self._count] = self.strategy.datetime[0]
+        self._count += 1
+
+    def get_analysis(self):
+        # backtrader数值日期 = 自0001-01-01起的天数 + 1，按微秒取整后转换 (与 bt.num2date 一致)
+        micros = np.rint((self._dtnums[:self._count] - 1.0) * 86400e6).astype(np.int64)
+        dts = (np.datetime64('0001-01-01T00:00:00', 'us') + micros.astype('timedelta64[us]')).astype('datetime64[ns]')
+        return {'equity': self._values[:self._count], 'dt': dts}
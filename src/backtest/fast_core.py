@@ -0,0 +1,312 @@
+import numpy as np
+from numba import njit
+from typing import Callable, Optional, Tuple
+
+
+@njit(cache=True, nogil=True)  # 预热期填充NaN，不能使用fastmath
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    计算简单移动平均，前 window-1 个值为NaN (与backtrader的SMA预热期一致)
+
+    参数:
+        values: 价格序列 (float64)
+        window: 窗口长度
+
+    返回:
+        移动平均序列
+    """
+    n = values.size
+    out = np.full(n, np.nan)
+    if window <= 0 or window > n:
+        return out
+    acc = 0.0
+    for i in range(n):
+        acc += values[i]
+        if i >= window:
+            acc -= values[i - window]
+        if i >= window - 1:
+            out[i] = acc / window
+    return out
+
+
+@njit(cache=True, nogil=True)  # 预热期填充NaN，不能使用fastmath
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    计算滚动总体标准差，与backtrader的StdDev一致: sqrt(|mean(x^2) - mean(x)^2|)
+
+    参数:
+        values: 价格序列 (float64)
+        window: 窗口长度
+
+    返回:
+        标准差序列，前 window-1 个值为NaN
+    """
+    mean = rolling_mean(values, window)
+    meansq = rolling_mean(values * values, window)
+    return np.sqrt(np.abs(meansq - mean * mean))
+
+
+@njit(cache=True, nogil=True)  # 依赖NaN判断，不能使用fastmath
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    计算指数移动平均，与backtrader的EMA一致: 以前 period 个有效值的均值为种子，alpha = 2 / (period + 1)
+
+    参数:
+        values: 输入序列，开头可以有NaN (例如其他指标的预热期)
+        period: 周期
+
+    返回:
+        指数移动平均序列，种子之前为NaN
+    """
+    n = values.size
+    out = np.full(n, np.nan)
+    first = 0
+    while first < n and np.isnan(values[first]):
+        first += 1
+    seed_end = first + period - 1
+    if period <= 0 or seed_end >= n:
+        return out
+    acc = 0.0
+    for i in range(first, seed_end + 1):
+        acc += values[i]
+    out[seed_end] = acc / period
+    alpha = 2.0 / (1.0 + period)
+    for i in range(seed_end + 1, n):
+        out[i] = out[i - 1] * (1.0 - alpha) + values[i] * alpha
+    return out
+
+
+@njit(cache=True, nogil=True)  # 依赖NaN判断，不能使用fastmath
+def crossover(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    与backtrader的CrossOver一致的交叉信号: 1为a上穿b，-1为a下穿b，0为无交叉
+
+    差值为0时沿用上一个非零差值判断穿越方向，任一输入为NaN (预热期) 时为0。
+
+    参数:
+        a: 第一条序列
+        b: 第二条序列
+
+    返回:
+        交叉信号序列
+    """
+    n = a.size
+    out = np.zeros(n)
+    nzd = np.nan  # 上一根bar的非零差值
+    for i in range(n):
+        d = a[i] - b[i]
+        if np.isnan(d):
+            continue
+        if not np.isnan(nzd):
+            if nzd < 0 and d > 0:
+                out[i] = 1.0
+            elif nzd > 0 and d < 0:
+                out[i] = -1.0
+        if d != 0 or np.isnan(nzd):
+            nzd = d
+    return out
+
+
+# 模拟状态数组下标，分段模拟时在各段之间传递
+_CASH, _POSITION, _BUY_PRICE, _ENTRY_COST, _PENDING, _N_TRADES, _WON, _LOST, _STOP_PRICE = range(9)
+_STATE_SIZE = 9
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _simulate_range(open_: np.ndarray,
+                    close: np.ndarray,
+                    entries: np.ndarray,
+                    exits: np.ndarray,
+                    commission: float,
+                    order_percentage: float,
+                    stop_loss: float,
+                    trailing_stop: float,
+                    equity: np.ndarray,
+                    state: np.ndarray,
+                    start: int,
+                    stop: int) -> None:
+    """
+    模拟 [start, stop) 区间内的bar，结果写入 equity，持仓/资金等状态在 state 中原地更新
+    """
+    cash = state[_CASH]
+    position = int(state[_POSITION])
+    buy_price = state[_BUY_PRICE]
+    entry_cost = state[_ENTRY_COST]
+    pending = int(state[_PENDING])  # 待成交订单: >0买入数量, -1卖出, 0无
+    n_trades = int(state[_N_TRADES])
+    won = int(state[_WON])
+    lost = int(state[_LOST])
+    stop_price = state[_STOP_PRICE]
+    # 止损价系数在循环外计算一次
+    stop_mult = 1 - stop_loss
+    trailing_mult = 1 - trailing_stop
+
+    for i in range(start, stop):
+        # 执行上一根bar产生的订单
+        if pending != 0:
+            price = open_[i]
+            if pending > 0:
+                cost = pending * price
+                comm = cost * commission
+                if cost + comm <= cash:
+                    cash -= cost + comm
+                    position = pending
+                    buy_price = price
+                    entry_cost = cost + comm
+                    stop_price = price * stop_mult
+                    n_trades += 1
+            else:
+                proceeds = position * price
+                comm = proceeds * commission
+                cash += proceeds - comm
+                if proceeds - comm - entry_cost > 0:
+                    won += 1
+                else:
+                    lost += 1
+                position = 0
+            pending = 0
+
+        equity[i] = cash + position * close[i]
+
+        if position == 0:
+            if entries[i]:
+                size = int(cash / close[i] * order_percentage)
+                # 与backtrader提交订单时的资金检查一致: 按当前收盘价加手续费计算，资金不足时订单被拒绝
+                if size > 0 and cash - size * close[i] - size * close[i] * commission >= 0.0:
+                    pending = size
+        else:
+            # 跟踪止损: 价格高于买入价时，止损价随收盘价上移
+            if trailing_stop > 0 and close[i] > buy_price:
+                stop_price = max(stop_price, close[i] * trailing_mult)
+            if exits[i] or close[i] <= stop_price:
+                pending = -1
+
+    state[_CASH] = cash
+    state[_POSITION] = position
+    state[_BUY_PRICE] = buy_price
+    state[_ENTRY_COST] = entry_cost
+    state[_PENDING] = pending
+    state[_N_TRADES] = n_trades
+    state[_WON] = won
+    state[_LOST] = lost
+    state[_STOP_PRICE] = stop_price
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def simulate(open_: np.ndarray,
+             close: np.ndarray,
+             entries: np.ndarray,
+             exits: np.ndarray,
+             cash0: float,
+             commission: float,
+             order_percentage: float,
+             stop_loss: float,
+             trailing_stop: float = 0.0) -> Tuple[np.ndarray, int, int, int]:
+    """
+    按买卖信号逐bar模拟单资产多头交易，复现策略 next() 中的下单和止损逻辑
+
+    与backtrader的市价单一致: 第i根bar收盘后产生的信号在第i+1根bar的开盘价成交，
+    手续费按成交金额的比例收取，提交时 (按收盘价) 或成交时 (按开盘价) 资金不足订单都会被拒绝。
+    空仓时出现买入信号按 order_percentage 比例下单；持仓时出现卖出信号、
+    或收盘价跌破止损价 (成交价 * (1 - stop_loss)，开启跟踪止损时随价格上移) 时全部卖出。
+
+    参数:
+        open_: 开盘价序列
+        close: 收盘价序列
+        entries: 买入信号 (布尔数组，由策略的 compute_signals 计算)
+        exits: 卖出信号 (布尔数组)
+        cash0: 初始资金
+        commission: 手续费率
+        order_percentage: 下单资金比例
+        stop_loss: 止损比例
+        trailing_stop: 跟踪止损比例，0表示不使用跟踪止损
+
+    返回:
+        (每根bar的组合价值, 交易次数, 盈利交易数, 亏损交易数)
+    """
+    n = close.size
+    equity = np.empty(n)
+    state = np.zeros(_STATE_SIZE)
+    state[_CASH] = cash0
+    _simulate_range(open_, close, entries, exits, commission, order_percentage, stop_loss, trailing_stop,
+                    equity, state, 0, n)
+    return equity, int(state[_N_TRADES]), int(state[_WON]), int(state[_LOST])
+
+
+@njit(cache=True, nogil=True)
+def simulate_batch(open_: np.ndarray,
+                   close: np.ndarray,
+                   entries: np.ndarray,
+                   exits: np.ndarray,
+                   cash0: float,
+                   commission: float,
+                   order_percentage: np.ndarray,
+                   stop_loss: np.ndarray,
+                   trailing_stop: np.ndarray) -> np.ndarray:
+    """
+    一次模拟多组参数，所有组合共用同一份价格数据，逐行结果与单独调用 simulate 完全一致
+
+    执行期间释放GIL，调用方可以把参数组合分批交给多个线程同时模拟
+    (不使用Numba的prange: 其线程池在fork出的子进程中会导致退出时挂起，而backtrader和并行优化都依赖fork)。
+
+    参数:
+        open_, close: 开盘价、收盘价序列 (长度n)
+        entries, exits: 买入、卖出信号 (形状 (k, n) 的布尔数组，每行一组参数)
+        cash0, commission: 同 simulate
+        order_percentage, stop_loss, trailing_stop: 各组合的下单资金比例、止损比例、跟踪止损比例 (长度k)
+
+    返回:
+        每组合每根bar的组合价值，形状 (k, n)
+    """
+    k = entries.shape[0]
+    n = close.size
+    equity = np.empty((k, n))
+    state = np.empty(_STATE_SIZE)
+    for j in range(k):
+        state[:] = 0.0
+        state[_CASH] = cash0
+        _simulate_range(open_, close, entries[j], exits[j], commission, order_percentage[j], stop_loss[j],
+                        trailing_stop[j], equity[j], state, 0, n)
+    return equity
+
+
+def simulate_with_checkpoints(open_: np.ndarray,
+                              close: np.ndarray,
+                              entries: np.ndarray,
+                              exits: np.ndarray,
+                              cash0: float,
+                              commission: float,
+                              order_percentage: float,
+                              stop_loss: float,
+                              trailing_stop: float = 0.0,
+                              on_checkpoint: Optional[Callable[[int, np.ndarray], bool]] = None,
+                              n_checkpoints: int = 10) -> Tuple[np.ndarray, int, int, int]:
+    """
+    分段执行 simulate，每完成约 1/n_checkpoints 的bar调用一次 on_checkpoint
+
+    参数:
+        open_, close, entries, exits, cash0, commission, order_percentage, stop_loss, trailing_stop: 同 simulate
+        on_checkpoint: 回调 (已完成bar的百分比, 截至当前的组合价值) -> 是否提前终止
+        n_checkpoints: 检查点数量
+
+    返回:
+        同 simulate；被回调提前终止时，组合价值序列只包含已模拟的部分
+    """
+    if on_checkpoint is None:
+        return simulate(open_, close, entries, exits, cash0, commission, order_percentage, stop_loss, trailing_stop)
+
+    n = close.size
+    equity = np.empty(n)
+    state = np.zeros(_STATE_SIZE)
+    state[_CASH] = cash0
+    start = 0
+    for k in range(1, n_checkpoints + 1):
+        stop = -(-k * n // n_checkpoints)  # ceil(k * n / n_checkpoints)
+        if stop <= start:
+            continue
+        _simulate_range(open_, close, entries, exits, commission, order_percentage, stop_loss, trailing_stop,
+                        equity, state, start, stop)
+        start = stop
+        if on_checkpoint(100 * stop // n, equity[:stop]):
+            break
+    return equity[:start], int(state[_N_TRADES]), int(state[_WON]), int(state[_LOST])
@@ -1,4 +1,6 @@
-from .base import BaseDataGenerator
+from typing import Dict, Type
+
+from .base import BaseDataGenerator, ArrayPandasData, share_frame, load_shared_frame
 from .monte_carlo import MonteCarloGenerator
 from .garch import GARCHGenerator
 from .extreme import ExtremeEventGenerator
@@ -6,8 +8,22 @@ from .regime import RegimeSwitchingGenerator
 from .multi_asset import MultiAssetGenerator
 from .stress_test import StressTestGenerator
 
+# 数据生成器类型 (config中的 data_generator.type) 到生成器类的注册表，回测与优化共用
+DATA_GENERATOR_REGISTRY: Dict[str, Type[BaseDataGenerator]] = {
+    'monte_carlo': MonteCarloGenerator,
+    'garch': GARCHGenerator,
+    'extreme': ExtremeEventGenerator,
+    'regime': RegimeSwitchingGenerator,
+    'multi_asset': MultiAssetGenerator,
+    'stress_test': StressTestGenerator,
+}
+
 __all__ = [
+    'DATA_GENERATOR_REGISTRY',
     'BaseDataGenerator',
+    'ArrayPandasData',
+    'share_frame',
+    'load_shared_frame',
     'MonteCarloGenerator',
     'GARCHGenerator',
     'ExtremeEventGenerator',
@@ -1,13 +1,38 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional
-from datetime import datetime, timedelta
-# Need to install arch package for GARCH model
-# pip install arch
-from arch import arch_model
+from numba import njit
 
 from .base import BaseDataGenerator
 
+
+@njit(cache=True)
+def _garch_prices(z: np.ndarray, start_price: float, sigma0: float,
+                  omega: float, alpha: float, beta: float) -> np.ndarray:
+    """
+    GARCH(1,1) 递推：按预先抽取的标准正态随机数生成价格路径
+
+    参数:
+        z: 标准正态随机数，长度即价格序列长度 (z[0] 不使用)
+        start_price: 起始价格
+        sigma0: 初始波动率
+        omega, alpha, beta: GARCH(1,1) 参数
+
+    返回:
+        价格数组
+    """
+    n = z.shape[0]
+    prices = np.empty(n)
+    prices[0] = start_price
+    variance = sigma0 * sigma0
+    for t in range(1, n):
+        # Generate return based on GARCH volatility
+        ret = np.sqrt(variance) * z[t]
+        prices[t] = prices[t-1] * np.exp(ret)
+        # Update variance for next period
+        variance = omega + alpha * ret * ret + beta * variance
+    return prices
+
 class GARCHGenerator(BaseDataGenerator):
     """
     GARCH模型数据生成器，用于模拟金融时间序列中的波动率聚类特性
@@ -26,6 +51,14 @@ class GARCHGenerator(BaseDataGenerator):
         self.alpha = garch_config.get('alpha', 0.1)
         self.beta = garch_config.get('beta', 0.8)
         self.initial_price = config.get('initial_price', 100.0) # Added initial price
+
+        # Initial volatility: long-run (unconditional) level, only defined when alpha + beta < 1
+        persistence = 1 - self.alpha - self.beta
+        if persistence > 0:
+            self._sigma0 = float(np.sqrt(self.omega / persistence))
+        else:
+            print(f"警告: GARCH参数 alpha + beta = {self.alpha + self.beta:.4f} >= 1，过程非平稳，初始波动率取 sqrt(omega)")
+            self._sigma0 = float(np.sqrt(self.omega))
         
     def generate(self, base_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
@@ -37,62 +70,37 @@ class GARCHGenerator(BaseDataGenerator):
         返回:
             pandas DataFrame，包含OHLCV数据
         """
-        returns = np.zeros(self.length)
-        volatility = np.zeros(self.length)
-        prices = np.zeros(self.length)
-
         # Set initial price
         if base_data is not None and not base_data.empty:
-            prices[0] = base_data['close'].iloc[-1]
+            start_price = float(base_data['close'].iloc[-1])
             # Fit GARCH to base_data returns to get better starting parameters if desired
             # For simplicity, we'll use configured parameters or defaults
             # returns_base = base_data['close'].pct_change().dropna()
             # if len(returns_base) > 5: # Need enough data to fit
+            #     from arch import arch_model  # pip install arch; 导入较慢，仅在拟合时加载
             #     model = arch_model(returns_base * 100, vol='Garch', p=1, q=1)
             #     res = model.fit(disp='off')
             #     self.omega = res.params['omega']
             #     self.alpha = res.params['alpha[1]']
             #     self.beta = res.params['beta[1]']
         else:
-            prices[0] = self.initial_price
-
+            start_price = float(self.initial_price)
 
-        # Initialize first volatility value (e.g., long-run average or from base_data)
-        volatility[0] = np.sqrt(self.omega / (1 - self.alpha - self.beta)) if (1 - self.alpha - self.beta) > 0 else np.sqrt(self.omega)
 
-
-        for t in range(1, self.length):
-            # Generate return based on GARCH volatility
-            returns[t] = np.random.normal(0, volatility[t-1])
-            # Update price
-            prices[t] = prices[t-1] * np.exp(returns[t])
-            # Update volatility for next period
-            volatility[t] = np.sqrt(self.omega + self.alpha * returns[t]**2 + self.beta * volatility[t-1]**2)
+        # 随机数一次性抽取，方差递推在编译后的循环中完成
+        z = self._rng.standard_normal(self.length)
+        prices = _garch_prices(z, start_price, self._sigma0,
+                               float(self.omega), float(self.alpha), float(self.beta))
 
         # Create datetime index
-        freq = self.config.get('frequency', 'D')
-        if freq == 'D':
-            time_delta = timedelta(days=1)
-        elif freq == 'H':
-            time_delta = timedelta(hours=1)
-        elif freq == 'M':
-            time_delta = timedelta(minutes=1)
-        else:
-            time_delta = timedelta(days=1) # Default to daily
-
-        if base_data is not None and not base_data.empty and isinstance(base_data.index, pd.DatetimeIndex):
-            start_date = base_data.index[-1] + time_delta
-        else:
-            start_date = datetime(2020, 1, 1) # Default start date
-            
-        dates = pd.to_datetime([start_date + i * time_delta for i in range(self.length)])
+        dates = self._make_index(base_data)
         
-        df = pd.DataFrame(index=dates)
-        df['open'] = prices # Simplification: O=H=L=C for this example
-        df['high'] = prices
-        df['low'] = prices
-        df['close'] = prices
-        df['volume'] = np.random.randint(100, 1000, size=self.length) # Random volume
-        df.index.name = 'datetime'
+        df = self._as_frame(dates, {
+            'open': prices, # Simplification: O=H=L=C for this example
+            'high': prices,
+            'low': prices,
+            'close': prices,
+            'volume': self._rng.integers(100, 1000, size=self.length, dtype=np.int64), # Random volume
+        })
         
         return df
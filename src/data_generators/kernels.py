@@ -0,0 +1,100 @@
+import numpy as np
+from numba import njit
+from typing import Tuple, Union
+
+
+# 生成器共用的逐bar循环。随机数都由调用方预先抽取后传入，
+# 生成器类只负责抽取随机数和组装DataFrame。
+
+def gbm_path(start_price: Union[float, np.ndarray], drift: float, shocks: np.ndarray) -> np.ndarray:
+    """
+    几何布朗运动价格路径: price[t] = price[t-1] * exp(drift + shocks[t])
+
+    递推只是逐步累乘，由 np.cumprod 按顺序完成；指数部分用NumPy整体计算
+    (与逐元素调用 np.exp 的结果完全一致，Numba编译的exp在末位上会有差异)。
+    shocks 为二维数组时每一行是一条路径，结果与逐行单独计算完全一致。
+
+    参数:
+        start_price: 起始价格 (多条路径时为每条路径的起始价格数组)
+        drift: 每步漂移
+        shocks: 每步随机冲击 (已乘以波动率)，最后一维长度即价格序列长度 (第0步不使用)
+
+    返回:
+        价格数组，形状与 shocks 相同
+    """
+    growth = np.exp(drift + shocks)
+    if growth.shape[-1]:
+        growth[..., 0] = start_price
+    return np.cumprod(growth, axis=-1)
+
+
+@njit(cache=True)
+def ohlc_from_close(close: np.ndarray, gaps: np.ndarray, high_draws: np.ndarray,
+                    low_draws: np.ndarray, sigma: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    由收盘价生成开盘价、最高价、最低价
+
+    开盘价为前一收盘价加上隔夜跳空，高低价的波动幅度取当日开收盘差与 close * sigma 中的较大者，
+    上涨日向上、下跌日向下扩展更多，最后保证 low <= open/close <= high 且 low >= 0.01。
+
+    参数:
+        close: 收盘价
+        gaps: 隔夜跳空比例 (gaps[0] 不使用)
+        high_draws, low_draws: [0, 1) 均匀随机数
+        sigma: 波动率
+
+    返回:
+        (开盘价, 最高价, 最低价)
+    """
+    n = close.shape[0]
+    opens = np.empty(n)
+    highs = np.empty(n)
+    lows = np.empty(n)
+    for i in range(n):
+        # 第一根bar的开盘价等于收盘价
+        opens[i] = close[0] if i == 0 else close[i - 1] * (1 + gaps[i])
+        daily_volatility = max(abs(opens[i] - close[i]), close[i] * sigma)
+        if close[i] >= opens[i]:  # 上涨日
+            high = close[i] + high_draws[i] * daily_volatility
+            low = opens[i] - low_draws[i] * daily_volatility / 2
+        else:  # 下跌日
+            high = opens[i] + high_draws[i] * daily_volatility / 2
+            low = close[i] - low_draws[i] * daily_volatility
+        low = max(low, 0.01)
+        highs[i] = max(high, opens[i], close[i])
+        lows[i] = min(low, opens[i], close[i])
+    return opens, highs, lows
+
+
+@njit(cache=True)
+def price_driven_volume(base_volume: np.ndarray, close: np.ndarray, impact: float, sqrt_response: bool) -> np.ndarray:
+    """
+    单次遍历生成成交量: 自相关平滑、按价格变动放大、四舍五入为整数
+
+    自相关: 新成交量有60%来自前一期的成交量，40%来自基础成交量；
+    放大系数为 1 + impact * |价格变动率| (sqrt_response为True时取变动率的平方根，大涨大跌放大得更平缓)，
+    首根bar的变动率为0。
+
+    参数:
+        base_volume: 基础成交量
+        close: 收盘价
+        impact: 价格变动对成交量的影响系数
+        sqrt_response: 是否按变动率的平方根放大
+
+    返回:
+        成交量数组 (int64)
+    """
+    n = base_volume.shape[0]
+    out = np.empty(n, dtype=np.int64)
+    smoothed = 0.0
+    for t in range(n):
+        if t == 0:
+            smoothed = base_volume[0]
+            change = 0.0
+        else:
+            smoothed = 0.6 * smoothed + 0.4 * base_volume[t]
+            change = abs((close[t] - close[t - 1]) / close[t - 1])
+        if sqrt_response:
+            change = np.sqrt(change)
+        out[t] = np.int64(np.rint(smoothed * (1 + impact * change)))
+    return out
@@ -1,9 +1,9 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
 
-from .base import BaseDataGenerator
+from .base import ArrayPandasData, BaseDataGenerator
+from .kernels import gbm_path, ohlc_from_close, price_driven_volume
 
 class MultiAssetGenerator(BaseDataGenerator):
     """
@@ -12,7 +12,9 @@ class MultiAssetGenerator(BaseDataGenerator):
     该生成器可以创建多个具有特定相关性结构的资产价格序列，
     适合测试资产配置和多资产交易策略。
     """
-    
+
+    business_days = True  # 日线数据按工作日排列
+
     def __init__(self, config: Dict[str, Any]):
         """
         初始化多资产相关性数据生成器
@@ -31,12 +33,15 @@ class MultiAssetGenerator(BaseDataGenerator):
             self.asset_names = [f'Asset_{i+1}' for i in range(self.num_assets)]
         
         # 相关性矩阵，默认为单位矩阵（资产间无相关性）
-        self.correlation_matrix = multi_asset_config.get('correlation_matrix', np.eye(self.num_assets))
+        self.correlation_matrix = np.asarray(multi_asset_config.get('correlation_matrix', np.eye(self.num_assets)),
+                                             dtype=np.float64)
         
         # 检查相关性矩阵尺寸
-        if np.array(self.correlation_matrix).shape != (self.num_assets, self.num_assets):
+        if self.correlation_matrix.shape != (self.num_assets, self.num_assets):
             print(f"相关性矩阵尺寸不匹配，使用默认单位矩阵")
             self.correlation_matrix = np.eye(self.num_assets)
+        # Cholesky分解只取决于相关性矩阵，在这里计算一次
+        self._cholesky = np.linalg.cholesky(self.correlation_matrix)
         
         # 各资产的波动率和漂移率
         self.sigmas = multi_asset_config.get('sigmas', [0.01] * self.num_assets)  # 波动率
@@ -69,111 +74,45 @@ class MultiAssetGenerator(BaseDataGenerator):
                     start_prices[i] = base_data[f'{name}_close'].iloc[-1]
         
         # 创建日期索引
-        freq = self.config.get('frequency', 'D')
-        if freq == 'D':
-            time_delta = timedelta(days=1)
-            freq_str = 'B'  # 使用工作日
-        elif freq == 'H':
-            time_delta = timedelta(hours=1)
-            freq_str = 'H'
-        elif freq == 'M':
-            time_delta = timedelta(minutes=1)
-            freq_str = 'T'  # 分钟用T表示
-        else:
-            time_delta = timedelta(days=1)  # 默认为日线
-            freq_str = 'B'
-
-        # 设置起始日期
-        if base_data is not None and not base_data.empty and isinstance(base_data.index, pd.DatetimeIndex):
-            start_date = base_data.index[-1] + time_delta
-        else:
-            start_date = datetime(2020, 1, 1)  # 默认起始日期
-        
-        # 使用pandas的date_range生成更好的日期序列
-        dates = pd.date_range(start=start_date, periods=self.length, freq=freq_str)
-        
-        # 创建包含所有资产数据的DataFrame
-        df = pd.DataFrame(index=dates)
+        dates = self._make_index(base_data)
         
         # 生成相关的随机数
         # 使用Cholesky分解生成相关的正态随机数
-        L = np.linalg.cholesky(self.correlation_matrix)
-        uncorrelated_random = np.random.normal(0, 1, size=(self.length, self.num_assets))
-        correlated_random = uncorrelated_random @ L.T
+        uncorrelated_random = self._rng.standard_normal((self.length, self.num_assets))
+        correlated_random = uncorrelated_random @ self._cholesky.T
         
         # 为每个资产生成价格序列
+        sqrt_dt = np.sqrt(dt)
+        columns = {}
         for i in range(self.num_assets):
             asset_name = self.asset_names[i]
             mu = self.mus[i]
             sigma = self.sigmas[i]
+
+            # 该资产的开盘跳空和高低价随机数一次性抽取
+            gap_factor = sigma / 2
+            gaps = self._rng.uniform(-gap_factor, gap_factor, size=self.length)
+            high_draws = self._rng.random(self.length)
+            low_draws = self._rng.random(self.length)
             
             # 生成收盘价序列
-            prices = [start_prices[i]]
-            for j in range(1, self.length):
-                drift = mu * dt
-                shock = sigma * np.sqrt(dt) * correlated_random[j, i]
-                price = prices[-1] * np.exp(drift + shock)
-                prices.append(price)
+            shocks = sigma * sqrt_dt * correlated_random[:, i]
+            prices = gbm_path(float(start_prices[i]), mu * dt, shocks)
             
             # 生成开盘价、最高价、最低价
-            opens = []
-            highs = []
-            lows = []
+            opens, highs, lows = ohlc_from_close(prices, gaps, high_draws, low_draws, sigma)
             
-            # 第一天的开盘价等于起始价格
-            opens.append(prices[0])
+            # 生成成交量 (带自相关性，价格变动大的日子成交量往往更大)
+            base_volume = self._rng.lognormal(mean=8, sigma=1, size=self.length)
             
-            # 为后续日期生成开盘价
-            for j in range(1, len(prices)):
-                # 开盘价基于前一天收盘价有小幅波动
-                gap_factor = sigma / 2
-                opens.append(prices[j-1] * (1 + np.random.uniform(-gap_factor, gap_factor)))
-            
-            # 生成最高价和最低价
-            for j in range(len(prices)):
-                # 计算当天价格变动范围
-                price_range = abs(opens[j] - prices[j])
-                daily_volatility = max(price_range, prices[j] * sigma)
-                
-                # 最高价和最低价
-                if prices[j] >= opens[j]:  # 上涨日
-                    high = prices[j] + np.random.uniform(0, daily_volatility)
-                    low = opens[j] - np.random.uniform(0, daily_volatility / 2)
-                else:  # 下跌日
-                    high = opens[j] + np.random.uniform(0, daily_volatility / 2)
-                    low = prices[j] - np.random.uniform(0, daily_volatility)
-                
-                # 确保最低价大于0且关系正确
-                low = max(low, 0.01)
-                high = max(high, opens[j], prices[j])
-                low = min(low, opens[j], prices[j])
-                
-                highs.append(high)
-                lows.append(low)
-            
-            # 生成成交量
-            base_volume = np.random.lognormal(mean=8, sigma=1, size=self.length)
-            
-            # 添加自相关性
-            volume = np.zeros(self.length)
-            volume[0] = base_volume[0]
-            for j in range(1, self.length):
-                volume[j] = 0.6 * volume[j-1] + 0.4 * base_volume[j]
-            
-            # 价格变动大的日子，成交量往往更大
-            price_changes = np.zeros(self.length)
-            price_changes[1:] = np.abs(np.diff(prices) / prices[:-1])
-            volume_factor = 1 + 5 * price_changes**0.5
-            
-            # 添加到DataFrame
-            df[f'{asset_name}_open'] = opens
-            df[f'{asset_name}_high'] = highs
-            df[f'{asset_name}_low'] = lows
-            df[f'{asset_name}_close'] = prices
-            df[f'{asset_name}_volume'] = (volume * volume_factor).astype(int)
+            columns[f'{asset_name}_open'] = opens
+            columns[f'{asset_name}_high'] = highs
+            columns[f'{asset_name}_low'] = lows
+            columns[f'{asset_name}_close'] = prices
+            columns[f'{asset_name}_volume'] = price_driven_volume(base_volume, prices, 5.0, True)
         
-        df.index.name = 'datetime'
-        return df
+        # 所有资产的列生成完毕后一次性构建DataFrame
+        return self._as_frame(dates, columns)
         
     def to_bt_feed(self, data: pd.DataFrame) -> List:
         """
@@ -185,8 +124,6 @@ class MultiAssetGenerator(BaseDataGenerator):
         返回:
             backtrader的PandasData对象列表
         """
-        from backtrader.feeds import PandasData
-        
         data_feeds = []
         
         for asset_name in self.asset_names:
@@ -201,7 +138,7 @@ class MultiAssetGenerator(BaseDataGenerator):
             }, index=data.index)
             
             # 创建PandasData对象
-            data_feed = PandasData(dataname=asset_data, name=asset_name)
+            data_feed = ArrayPandasData(dataname=asset_data, name=asset_name)
             data_feeds.append(data_feed)
             
         return data_feeds 
\ No newline at end of file
@@ -1,9 +1,39 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from numba import njit
 
 from .base import BaseDataGenerator
+from .kernels import gbm_path
+
+
+@njit(cache=True)
+def _regime_states(transition_draws: np.ndarray, transition_cdf: np.ndarray, start_state: int) -> np.ndarray:
+    """
+    马尔科夫链的状态序列
+
+    下一个状态由 [0, 1) 均匀随机数对当前状态转移概率的累积分布求逆得到，
+    与 Generator.choice(states, p=transition_matrix[state]) 逐步抽取的结果一致。
+
+    参数:
+        transition_draws: 状态转移用的均匀随机数，长度为序列长度减1
+        transition_cdf: 转移概率矩阵按行的累积分布
+        start_state: 起始状态
+
+    返回:
+        状态数组
+    """
+    n_states = transition_cdf.shape[1]
+    regimes = np.empty(transition_draws.shape[0] + 1, dtype=np.int64)
+    state = start_state
+    regimes[0] = state
+    for t in range(1, regimes.shape[0]):
+        next_state = 0
+        while next_state < n_states - 1 and transition_cdf[state, next_state] <= transition_draws[t - 1]:
+            next_state += 1
+        state = next_state
+        regimes[t] = state
+    return regimes
 
 class RegimeSwitchingGenerator(BaseDataGenerator):
     """
@@ -31,12 +61,10 @@ class RegimeSwitchingGenerator(BaseDataGenerator):
         ])
         if len(self.regime_params) != self.states:
             raise ValueError("Length of regime_params must match the number of states.")
+        if np.any(self.transition_matrix < 0) or not np.allclose(self.transition_matrix.sum(axis=1), 1):
+            raise ValueError("Each row of transition_matrix must be a probability distribution.")
         self.initial_price = config.get('initial_price', 100.0)
 
-    def _get_next_state(self, current_state: int) -> int:
-        """Determine the next state based on the transition matrix."""
-        return np.random.choice(self.states, p=self.transition_matrix[current_state])
-        
     def generate(self, base_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
         使用马尔科夫链模拟不同市场状态下的价格行为
@@ -47,66 +75,45 @@ class RegimeSwitchingGenerator(BaseDataGenerator):
         返回:
             pandas DataFrame，包含OHLCV数据
         """
-        prices = np.zeros(self.length)
-        regimes = np.zeros(self.length, dtype=int)
-
         # Set initial price and state
         if base_data is not None and not base_data.empty:
-            prices[0] = base_data['close'].iloc[-1]
+            start_price = float(base_data['close'].iloc[-1])
             # Optionally, infer initial state from base_data characteristics
             # For simplicity, start with state 0
             current_state = 0 
         else:
-            prices[0] = self.initial_price
+            start_price = float(self.initial_price)
             current_state = 0 # Start in the first regime by default
-        
-        regimes[0] = current_state
 
-        for t in range(1, self.length):
-            # Get parameters for the current state
-            params = self.regime_params[current_state]
-            mu = params['mu']
-            sigma = params['sigma']
-            
-            # Generate return based on current regime's parameters
-            dt = 1 # Time step
-            drift = mu * dt
-            shock = sigma * np.sqrt(dt) * np.random.normal()
-            prices[t] = prices[t-1] * np.exp(drift + shock)
-            
-            # Determine next state
-            current_state = self._get_next_state(current_state)
-            regimes[t] = current_state
+        # Standard-normal shocks and state-transition draws for every step, drawn up front
+        z = self._rng.standard_normal(self.length)
+        transition_draws = self._rng.random(max(self.length - 1, 0))
+        transition_cdf = np.cumsum(self.transition_matrix, axis=1)
+        transition_cdf /= transition_cdf[:, -1:]
+        mus = np.array([params['mu'] for params in self.regime_params], dtype=np.float64)
+        sigmas = np.array([params['sigma'] for params in self.regime_params], dtype=np.float64)
+        regimes = _regime_states(transition_draws, transition_cdf, current_state)[:self.length]
 
-        # Create datetime index
-        freq = self.config.get('frequency', 'D')
-        if freq == 'D':
-            time_delta = timedelta(days=1)
-        elif freq == 'H':
-            time_delta = timedelta(hours=1)
-        elif freq == 'M':
-            time_delta = timedelta(minutes=1)
-        else:
-            time_delta = timedelta(days=1) # Default to daily
+        # Generate each return from the regime active before the transition
+        shocks = np.zeros(self.length)
+        shocks[1:] = mus[regimes[:-1]] + sigmas[regimes[:-1]] * z[1:]
+        prices = gbm_path(start_price, 0.0, shocks)
 
-        if base_data is not None and not base_data.empty and isinstance(base_data.index, pd.DatetimeIndex):
-            start_date = base_data.index[-1] + time_delta
-        else:
-            start_date = datetime(2020, 1, 1) # Default start date
-            
-        dates = pd.to_datetime([start_date + i * time_delta for i in range(self.length)])
+        # Create datetime index
+        dates = self._make_index(base_data)
         
-        df = pd.DataFrame(index=dates)
-        df['open'] = prices
-        df['high'] = [p * (1 + np.random.uniform(0, self.regime_params[reg]['sigma']/2)) for p, reg in zip(prices, regimes)]
-        df['low'] = [p * (1 - np.random.uniform(0, self.regime_params[reg]['sigma']/2)) for p, reg in zip(prices, regimes)]
-        df['close'] = prices
-        # Ensure low <= open/close <= high
-        df['high'] = df[['high', 'open', 'close']].max(axis=1)
-        df['low'] = df[['low', 'open', 'close']].min(axis=1)
-
-        df['volume'] = np.random.randint(100, 1000, size=self.length)
-        df['regime'] = regimes # Optionally include regime information
-        df.index.name = 'datetime'
+        # Per-bar H/L noise bound is half the active regime's sigma
+        half_sigmas = (sigmas / 2)[regimes]
+        highs = prices * (1 + self._rng.random(self.length) * half_sigmas)
+        lows = prices * (1 - self._rng.random(self.length) * half_sigmas)
+        df = self._as_frame(dates, {
+            'open': prices,
+            # Ensure low <= open/close <= high
+            'high': np.maximum(highs, prices),
+            'low': np.minimum(lows, prices),
+            'close': prices,
+            'volume': self._rng.integers(100, 1000, size=self.length, dtype=np.int64),
+            'regime': regimes, # Optionally include regime information
+        })
         
         return df
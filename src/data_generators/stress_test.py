@@ -1,10 +1,9 @@
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Optional, List, Tuple
-from datetime import datetime, timedelta
-import random
+from typing import Dict, Any, Optional, Tuple
 
 from .base import BaseDataGenerator
+from .kernels import gbm_path, ohlc_from_close, price_driven_volume
 
 class StressTestGenerator(BaseDataGenerator):
     """
@@ -13,7 +12,9 @@ class StressTestGenerator(BaseDataGenerator):
     该生成器可以模拟各种市场极端情况，如市场崩盘、暴涨、高波动期等，
     用于测试策略在极端市场环境下的表现。
     """
-    
+
+    business_days = True  # 日线数据按工作日排列
+
     def __init__(self, config: Dict[str, Any]):
         """
         初始化压力测试数据生成器
@@ -43,196 +44,125 @@ class StressTestGenerator(BaseDataGenerator):
         # 基础市场参数
         self.mu = stress_config.get('mu', 0.0001)  # 基础漂移率
         self.sigma = stress_config.get('sigma', 0.01)  # 基础波动率
-        
-    def _generate_crash(self, start_price: float) -> Tuple[List[float], List[float], List[float], List[float]]:
-        """生成市场崩盘数据"""
-        # 分三个阶段：正常期、崩盘期、恢复期
-        normal_days = self.length - self.crash_duration - self.crash_recovery
-        
+        # 崩盘/暴涨期与随后的恢复/修正期在基础波动率上放大
+        self._event_sigma = self.sigma * 1.5
+        self._aftermath_sigma = self.sigma * 1.2
+        
+    # 事件类型到收盘价路径构造方法的映射，'random' 时从中随机选择
+    EVENT_PATHS: Dict[str, str] = {
+        'crash': '_crash_paths',
+        'rally': '_rally_paths',
+        'volatility': '_high_volatility_paths',
+    }
+
+    def _phase_lengths(self, duration: int, aftermath: int) -> Tuple[int, int, int]:
+        """崩盘/暴涨类事件的三个阶段长度 (正常期、事件期、事件后)，正常期不足10根bar时三等分"""
+        normal_days = self.length - duration - aftermath
         # 确保至少有一些正常日
         if normal_days < 10:
             normal_days = self.length // 3
-            self.crash_duration = self.length // 3
-            self.crash_recovery = self.length - normal_days - self.crash_duration
+            duration = self.length // 3
+            aftermath = self.length - normal_days - duration
+        return normal_days, duration, aftermath
+
+    @staticmethod
+    def _interpolate_phase(start_prices: np.ndarray, end_prices: np.ndarray, progress: np.ndarray,
+                           sigma: float, z: np.ndarray) -> np.ndarray:
+        """在起止价格之间按 progress 做对数线性插值，并叠加随机波动"""
+        log_price = np.log(start_prices)[:, None] * (1 - progress) + np.log(end_prices)[:, None] * progress
+        log_price += sigma * z
+        return np.exp(log_price)
+
+    def _crash_paths(self, start_prices: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """生成市场崩盘的收盘价路径"""
+        # 分三个阶段：正常期、崩盘期、恢复期
+        normal_days, crash_duration, crash_recovery = self._phase_lengths(self.crash_duration, self.crash_recovery)
+        z_normal, z_crash, z_recovery = np.split(z, [normal_days, normal_days + crash_duration], axis=1)
         
         # 第一阶段：正常市场
-        prices_normal = [start_price]
-        for _ in range(1, normal_days):
-            drift = self.mu
-            shock = self.sigma * np.random.normal()
-            price = prices_normal[-1] * np.exp(drift + shock)
-            prices_normal.append(price)
+        prices_normal = gbm_path(start_prices, self.mu, self.sigma * z_normal)
         
-        # 第二阶段：市场崩盘
-        crash_start_price = prices_normal[-1]
+        # 第二阶段：市场崩盘，非线性崩盘路径，前期缓慢，后期加速，崩盘期波动加大
+        crash_start_price = prices_normal[:, -1]
         crash_end_price = crash_start_price * (1 - self.crash_intensity)
+        progress = (np.arange(crash_duration) / crash_duration) ** 2
+        prices_crash = self._interpolate_phase(crash_start_price, crash_end_price, progress, self._event_sigma, z_crash)
         
-        # 使用对数线性插值生成崩盘期价格
-        prices_crash = []
-        for i in range(self.crash_duration):
-            # 非线性崩盘路径，前期缓慢，后期加速
-            progress = (i / self.crash_duration) ** 2
-            log_price = np.log(crash_start_price) * (1 - progress) + np.log(crash_end_price) * progress
-            # 添加一些随机波动
-            log_price += self.sigma * 1.5 * np.random.normal()  # 崩盘期波动加大
-            prices_crash.append(np.exp(log_price))
-        
-        # 第三阶段：市场恢复
-        recovery_start_price = prices_crash[-1]
-        recovery_target = crash_start_price * 0.9  # 恢复到崩盘前的90%
-        
-        # 使用对数线性插值生成恢复期价格
-        prices_recovery = []
-        for i in range(self.crash_recovery):
-            # 非线性恢复路径，前期快速，后期放缓
-            progress = np.sqrt(i / self.crash_recovery)
-            log_price = np.log(recovery_start_price) * (1 - progress) + np.log(recovery_target) * progress
-            # 添加一些随机波动
-            log_price += self.sigma * 1.2 * np.random.normal()  # 恢复期波动略大
-            prices_recovery.append(np.exp(log_price))
+        # 第三阶段：市场恢复到崩盘前的90%，非线性恢复路径，前期快速，后期放缓，恢复期波动略大
+        recovery_target = crash_start_price * 0.9
+        progress = np.sqrt(np.arange(crash_recovery) / crash_recovery)
+        prices_recovery = self._interpolate_phase(prices_crash[:, -1], recovery_target, progress,
+                                                  self._aftermath_sigma, z_recovery)
         
         # 合并所有阶段的价格
-        prices = prices_normal + prices_crash + prices_recovery
-        
-        # 生成开盘价、最高价、最低价
-        opens, highs, lows = self._generate_ohlc(prices)
-        
-        return prices, opens, highs, lows
+        return np.concatenate([prices_normal, prices_crash, prices_recovery], axis=1)
     
-    def _generate_rally(self, start_price: float) -> Tuple[List[float], List[float], List[float], List[float]]:
-        """生成市场暴涨数据"""
+    def _rally_paths(self, start_prices: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """生成市场暴涨的收盘价路径"""
         # 分三个阶段：正常期、暴涨期、修正期
-        normal_days = self.length - self.rally_duration - self.rally_correction
-        
-        # 确保至少有一些正常日
-        if normal_days < 10:
-            normal_days = self.length // 3
-            self.rally_duration = self.length // 3
-            self.rally_correction = self.length - normal_days - self.rally_duration
+        normal_days, rally_duration, rally_correction = self._phase_lengths(self.rally_duration, self.rally_correction)
+        z_normal, z_rally, z_correction = np.split(z, [normal_days, normal_days + rally_duration], axis=1)
         
         # 第一阶段：正常市场
-        prices_normal = [start_price]
-        for _ in range(1, normal_days):
-            drift = self.mu
-            shock = self.sigma * np.random.normal()
-            price = prices_normal[-1] * np.exp(drift + shock)
-            prices_normal.append(price)
+        prices_normal = gbm_path(start_prices, self.mu, self.sigma * z_normal)
         
-        # 第二阶段：市场暴涨
-        rally_start_price = prices_normal[-1]
+        # 第二阶段：市场暴涨，非线性暴涨路径，前期缓慢，后期加速，暴涨期波动加大
+        rally_start_price = prices_normal[:, -1]
         rally_end_price = rally_start_price * (1 + self.rally_intensity)
+        progress = (np.arange(rally_duration) / rally_duration) ** 1.5
+        prices_rally = self._interpolate_phase(rally_start_price, rally_end_price, progress, self._event_sigma, z_rally)
         
-        # 使用对数线性插值生成暴涨期价格
-        prices_rally = []
-        for i in range(self.rally_duration):
-            # 非线性暴涨路径，前期缓慢，后期加速
-            progress = (i / self.rally_duration) ** 1.5
-            log_price = np.log(rally_start_price) * (1 - progress) + np.log(rally_end_price) * progress
-            # 添加一些随机波动
-            log_price += self.sigma * 1.5 * np.random.normal()  # 暴涨期波动加大
-            prices_rally.append(np.exp(log_price))
-        
-        # 第三阶段：市场修正
-        correction_start_price = prices_rally[-1]
-        correction_target = correction_start_price * 0.85  # 修正到高点的85%
-        
-        # 使用对数线性插值生成修正期价格
-        prices_correction = []
-        for i in range(self.rally_correction):
-            # 非线性修正路径
-            progress = (i / self.rally_correction) ** 0.8
-            log_price = np.log(correction_start_price) * (1 - progress) + np.log(correction_target) * progress
-            # 添加一些随机波动
-            log_price += self.sigma * 1.2 * np.random.normal()  # 修正期波动略大
-            prices_correction.append(np.exp(log_price))
+        # 第三阶段：市场修正到高点的85%，修正期波动略大
+        correction_start_price = prices_rally[:, -1]
+        correction_target = correction_start_price * 0.85
+        progress = (np.arange(rally_correction) / rally_correction) ** 0.8
+        prices_correction = self._interpolate_phase(correction_start_price, correction_target, progress,
+                                                    self._aftermath_sigma, z_correction)
         
         # 合并所有阶段的价格
-        prices = prices_normal + prices_rally + prices_correction
-        
-        # 生成开盘价、最高价、最低价
-        opens, highs, lows = self._generate_ohlc(prices)
-        
-        return prices, opens, highs, lows
+        return np.concatenate([prices_normal, prices_rally, prices_correction], axis=1)
     
-    def _generate_high_volatility(self, start_price: float) -> Tuple[List[float], List[float], List[float], List[float]]:
-        """生成高波动性数据"""
+    def _high_volatility_paths(self, start_prices: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """生成高波动性的收盘价路径"""
         # 分三个阶段：正常期、高波动期、恢复正常期
         normal_days_before = (self.length - self.vol_duration) // 2
-        normal_days_after = self.length - normal_days_before - self.vol_duration
+        z_before, z_vol, z_after = np.split(z, [normal_days_before, normal_days_before + self.vol_duration], axis=1)
         
         # 第一阶段：正常市场
-        prices_normal_before = [start_price]
-        for _ in range(1, normal_days_before):
-            drift = self.mu
-            shock = self.sigma * np.random.normal()
-            price = prices_normal_before[-1] * np.exp(drift + shock)
-            prices_normal_before.append(price)
+        prices_normal_before = gbm_path(start_prices, self.mu, self.sigma * z_before)
         
-        # 第二阶段：高波动期
-        vol_start_price = prices_normal_before[-1]
-        prices_vol = [vol_start_price]
-        for _ in range(1, self.vol_duration):
-            drift = self.mu
-            # 使用更高的波动率
-            shock = self.sigma * self.vol_multiplier * np.random.normal()
-            price = prices_vol[-1] * np.exp(drift + shock)
-            prices_vol.append(price)
+        # 第二阶段：高波动期，使用更高的波动率
+        prices_vol = gbm_path(prices_normal_before[:, -1], self.mu, self.sigma * self.vol_multiplier * z_vol)
         
         # 第三阶段：恢复正常
-        normal_after_start_price = prices_vol[-1]
-        prices_normal_after = [normal_after_start_price]
-        for _ in range(1, normal_days_after):
-            drift = self.mu
-            shock = self.sigma * np.random.normal()
-            price = prices_normal_after[-1] * np.exp(drift + shock)
-            prices_normal_after.append(price)
+        prices_normal_after = gbm_path(prices_vol[:, -1], self.mu, self.sigma * z_after)
         
         # 合并所有阶段的价格
-        prices = prices_normal_before + prices_vol + prices_normal_after
-        
-        # 生成开盘价、最高价、最低价
-        opens, highs, lows = self._generate_ohlc(prices)
-        
-        return prices, opens, highs, lows
+        return np.concatenate([prices_normal_before, prices_vol, prices_normal_after], axis=1)
+
+    def _event_paths(self, event: str, start_prices: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """
+        按事件类型生成一批收盘价路径
+
+        参数:
+            event: 事件类型 ('crash', 'rally', 'volatility')
+            start_prices: 各路径的起始价格, 形状 (k,)
+            z: 标准正态随机数, 形状 (k, length)，按行依次切分给各阶段
+
+        返回:
+            收盘价, 形状 (k, length)
+        """
+        return getattr(self, self.EVENT_PATHS[event])(np.asarray(start_prices, dtype=np.float64), z)
     
-    def _generate_ohlc(self, prices: List[float]) -> Tuple[List[float], List[float], List[float]]:
+    def _generate_ohlc(self, prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """从收盘价生成开盘价、最高价、最低价"""
-        opens = []
-        highs = []
-        lows = []
-        
-        # 第一天的开盘价等于收盘价
-        opens.append(prices[0])
-        
-        # 为后续日期生成开盘价
-        for i in range(1, len(prices)):
-            # 开盘价基于前一天收盘价有小幅波动
-            gap_factor = self.sigma / 2
-            opens.append(prices[i-1] * (1 + np.random.uniform(-gap_factor, gap_factor)))
-        
-        # 生成最高价和最低价
-        for i in range(len(prices)):
-            # 计算当天价格变动范围
-            price_range = abs(opens[i] - prices[i])
-            daily_volatility = max(price_range, prices[i] * self.sigma)
-            
-            # 最高价和最低价
-            if prices[i] >= opens[i]:  # 上涨日
-                high = prices[i] + np.random.uniform(0, daily_volatility)
-                low = opens[i] - np.random.uniform(0, daily_volatility / 2)
-            else:  # 下跌日
-                high = opens[i] + np.random.uniform(0, daily_volatility / 2)
-                low = prices[i] - np.random.uniform(0, daily_volatility)
-            
-            # 确保最低价大于0且关系正确
-            low = max(low, 0.01)
-            high = max(high, opens[i], prices[i])
-            low = min(low, opens[i], prices[i])
-            
-            highs.append(high)
-            lows.append(low)
-            
-        return opens, highs, lows
+        # 开盘跳空和高低价的随机数一次性抽取
+        n = len(prices)
+        gap_factor = self.sigma / 2
+        gaps = self._rng.uniform(-gap_factor, gap_factor, size=n)
+        high_draws = self._rng.random(n)
+        low_draws = self._rng.random(n)
+        return ohlc_from_close(prices, gaps, high_draws, low_draws, self.sigma)
         
     def generate(self, base_data: Optional[pd.DataFrame] = None) -> pd.DataFrame:
         """
@@ -250,67 +180,57 @@ class StressTestGenerator(BaseDataGenerator):
             start_price = base_data['close'].iloc[-1]
         
         # 根据事件类型生成价格序列
-        if self.event_type == 'crash':
-            prices, opens, highs, lows = self._generate_crash(start_price)
-        elif self.event_type == 'rally':
-            prices, opens, highs, lows = self._generate_rally(start_price)
-        elif self.event_type == 'volatility':
-            prices, opens, highs, lows = self._generate_high_volatility(start_price)
-        else:  # random
+        event = self.event_type
+        if event not in self.EVENT_PATHS:  # random
             # 随机选择一种极端事件
-            event = random.choice(['crash', 'rally', 'volatility'])
-            if event == 'crash':
-                prices, opens, highs, lows = self._generate_crash(start_price)
-            elif event == 'rally':
-                prices, opens, highs, lows = self._generate_rally(start_price)
-            else:
-                prices, opens, highs, lows = self._generate_high_volatility(start_price)
+            event = self._rng.choice(list(self.EVENT_PATHS))
+        z = self._rng.standard_normal((1, self.length))
+        prices = self._event_paths(event, [float(start_price)], z)[0]
         
-        # 创建日期索引
-        freq = self.config.get('frequency', 'D')
-        if freq == 'D':
-            freq_str = 'B'  # 使用工作日
-        elif freq == 'H':
-            freq_str = 'H'
-        elif freq == 'M':
-            freq_str = 'T'  # 分钟用T表示
-        else:
-            freq_str = 'B'
-
-        # 设置起始日期
-        if base_data is not None and not base_data.empty and isinstance(base_data.index, pd.DatetimeIndex):
-            start_date = base_data.index[-1] + timedelta(days=1)
-        else:
-            start_date = datetime(2020, 1, 1)  # 默认起始日期
-        
-        # 使用pandas的date_range生成日期序列
-        dates = pd.date_range(start=start_date, periods=len(prices), freq=freq_str)
+        # 生成开盘价、最高价、最低价
+        opens, highs, lows = self._generate_ohlc(prices)
         
-        # 创建DataFrame
-        df = pd.DataFrame(index=dates)
-        df['open'] = opens
-        df['high'] = highs
-        df['low'] = lows
-        df['close'] = prices
+        # 创建日期索引
+        dates = self._make_index(base_data, len(prices))
         
         # 生成成交量 - 在极端事件中，成交量通常与价格波动正相关
-        base_volume = np.random.lognormal(mean=8, sigma=1, size=len(prices))
-        
-        # 添加自相关性
-        volume = np.zeros(len(prices))
-        volume[0] = base_volume[0]
-        for i in range(1, len(prices)):
-            # 新成交量有60%来自前一天的成交量
-            volume[i] = 0.6 * volume[i-1] + 0.4 * base_volume[i]
-        
-        # 价格变动大的日子，成交量往往更大
-        price_changes = np.zeros(len(prices))
-        price_changes[1:] = np.abs(np.diff(prices) / prices[:-1])
-        
-        # 在极端事件中，成交量与价格变动的关系更强
-        volume_factor = 1 + 10 * price_changes  # 放大价格变动对成交量的影响
-        
-        df['volume'] = (volume * volume_factor).astype(int)
-        df.index.name = 'datetime'
-        
-        return df 
\ No newline at end of file
+        base_volume = self._rng.lognormal(mean=8, sigma=1, size=len(prices))
+        # 价格变动大的日子成交量往往更大，在极端事件中二者的关系更强 (线性放大)
+        volume = price_driven_volume(base_volume, prices, 10.0, False)
+        
+        df = self._as_frame(dates, {
+            'open': opens,
+            'high': highs,
+            'low': lows,
+            'close': prices,
+            'volume': volume,
+        })
+        
+        return df 
+
+    def generate_batch(self, k: int, start_price: float = 100.0) -> np.ndarray:
+        """
+        一次生成同一压力场景的 k 条收盘价路径，用于蒙特卡洛式的批量研究
+
+        所有路径的随机数一次性抽取，各阶段按 (k, length) 数组整体计算；
+        event_type 为 'random' 时每条路径各自随机选择事件类型。只生成收盘价，不生成OHLC和成交量。
+
+        参数:
+            k: 路径条数
+            start_price: 起始价格
+
+        返回:
+            收盘价, 形状 (k, length)，每行一条路径
+        """
+        start_prices = np.full(k, float(start_price))
+        if self.event_type in self.EVENT_PATHS:
+            return self._event_paths(self.event_type, start_prices, self._rng.standard_normal((k, self.length)))
+
+        events = self._rng.choice(list(self.EVENT_PATHS), size=k)
+        z = self._rng.standard_normal((k, self.length))
+        paths = np.empty((k, self.length))
+        for event in self.EVENT_PATHS:
+            rows = events == event
+            if rows.any():
+                paths[rows] = self._event_paths(event, start_prices[rows], z[rows])
+        return paths
@@ -2,42 +2,66 @@ import numpy as np
 import optuna
 import backtrader as bt
 import pandas as pd  # Added for portfolio_values series
-import json
+import orjson
 import os
+import shutil
+import warnings
 import datetime
-from typing import Dict, Any, Callable, Type, List, Tuple, Optional
-import importlib  # Added for dynamic strategy loading
-import os  # Added for path joining
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Callable, Type, List, Tuple, Optional, Union
 
 # Assuming these are correctly placed for import
-from src.data_generators.base import BaseDataGenerator  # For type hinting and usage
-from src.utils.metrics import calculate_metrics  # For calculating metrics
+from src.data_generators.base import (  # For type hinting and usage
+    DATA_CACHE_DIR, ArrayPandasData, BaseDataGenerator, load_shared_frame, share_frame
+)
+from src.data_generators import DATA_GENERATOR_REGISTRY
+from src.strategies import STRATEGY_REGISTRY, silence_strategy_log
+from src.utils.metrics import PERIODS_PER_YEAR, calculate_metrics, calculate_metrics_batch, span_in_years  # For calculating metrics
+from src.backtest.analyzers import FastEquityAnalyzer, PruningAnalyzer
+from src.backtest.fast_core import simulate_batch, simulate_with_checkpoints
+
+
+# 已读取的优化结果文件: 路径 -> (文件修改时间, 结果)，文件未变化时不再重复解析
+_SAVED_RESULTS: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+# 批量快速回测时每批的参数组合数，限制信号矩阵和组合价值矩阵的内存占用
+_FAST_BATCH_SIZE = 256
+
+
+def load_saved_results(result_file: str) -> Optional[Dict[str, Any]]:
+    """
+    读取 save_optimization_results 保存的优化结果，同一进程内按文件修改时间缓存
+
+    参数:
+        result_file: 结果文件路径
+
+    返回:
+        结果字典，文件不存在时返回None
+    """
+    try:
+        mtime = os.stat(result_file).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _SAVED_RESULTS.get(result_file)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with open(result_file, 'rb') as f:
+        results = orjson.loads(f.read())
+    _SAVED_RESULTS[result_file] = (mtime, results)
+    return results
 
 
 # Helper to get data generator (similar to run_backtest.py)
 def get_data_generator(config: Dict[str, Any]) -> BaseDataGenerator:
     generator_type = config.get('data_generator', {}).get('type', 'monte_carlo')
     data_config = config.get('data_generator', {})
-    if generator_type == 'monte_carlo':
-        from src.data_generators.monte_carlo import MonteCarloGenerator
-        return MonteCarloGenerator(data_config)
-    elif generator_type == 'garch':
-        from src.data_generators.garch import GARCHGenerator
-        return GARCHGenerator(data_config)
-    elif generator_type == 'extreme':
-        from src.data_generators.extreme import ExtremeEventGenerator
-        return ExtremeEventGenerator(data_config)
-    elif generator_type == 'regime':
-        from src.data_generators.regime import RegimeSwitchingGenerator
-        return RegimeSwitchingGenerator(data_config)
-    elif generator_type == 'multi_asset':
-        from src.data_generators.multi_asset import MultiAssetGenerator
-        return MultiAssetGenerator(data_config)
-    elif generator_type == 'stress_test':
-        from src.data_generators.stress_test import StressTestGenerator
-        return StressTestGenerator(data_config)
-    else:
+    try:
+        generator_cls = DATA_GENERATOR_REGISTRY[generator_type]
+    except KeyError:
         raise ValueError(f"Unknown data generator type: {generator_type}")
+    return generator_cls(data_config)
 
 
 # Helper to get strategy class (similar to run_backtest.py)
@@ -51,26 +75,10 @@ def get_strategy_class(strategy_name: str) -> Type[bt.Strategy]:
     返回:
         策略类
     """
-    # 处理不同的策略名称格式
-    if strategy_name == 'SampleStrategy':
-        module_name = 'src.strategies.sample_strategy'
-    elif strategy_name == 'DualMovingAverageStrategy':
-        module_name = 'src.strategies.dual_moving_average_strategy'
-    elif strategy_name == 'MeanReversionStrategy':
-        module_name = 'src.strategies.mean_reversion_strategy'
-    elif strategy_name == 'MomentumStrategy':
-        module_name = 'src.strategies.momentum_strategy'
-    else:
-        # 尝试使用默认格式
-        module_name = f"src.strategies.{strategy_name.lower()}_strategy"
-    
     try:
-        module = importlib.import_module(module_name)
-        return getattr(module, strategy_name)
-    except ImportError as e:
-        raise ImportError(f"无法导入策略模块: {module_name}. 错误: {e}")
-    except AttributeError:
-        raise AttributeError(f"在模块中未找到策略类 {strategy_name}.")
+        return STRATEGY_REGISTRY[strategy_name]
+    except KeyError:
+        raise ValueError(f"未知的策略类型: {strategy_name}")
 
 
 class OptunaOptimizer:
@@ -87,15 +95,51 @@ class OptunaOptimizer:
         self.trials = config.get('optimization', {}).get('trials', 100)
         self.metric = config.get('optimization', {}).get('metric', 'sharpe_ratio')
         self.direction = config.get('optimization', {}).get('direction', 'maximize')
+        self.seed = config.get('optimization', {}).get('seed', 42)
+        # 采样方式: tpe (默认) 或 grid (遍历全部参数组合的网格搜索)
+        self.sampler = config.get('optimization', {}).get('sampler', 'tpe')
+        self.grid_points = config.get('optimization', {}).get('grid_points', 5)
+        # 网格搜索时登记到study中的最好的参数组合数，完整的网格结果另存为Parquet文件
+        self.grid_top_k = config.get('optimization', {}).get('grid_top_k', 10)
+        self.maxcpus = config.get('optimization', {}).get('maxcpus') or os.cpu_count()
+        # TPE试验并行的进程数，需要持久化存储在进程间共享study
+        self.n_jobs = config.get('optimization', {}).get('n_jobs') or 1
+        # 提供 compute_signals 的策略在试验中使用Numba快速回测核心，不经过Cerebro
+        self.fast = config.get('optimization', {}).get('fast', True)
+        # TPE优化前用快速回测核心遍历参数网格，把最好的前k组参数排入study作为首批试验，0表示不预筛选
+        self.prefilter_top_k = config.get('optimization', {}).get('prefilter_top_k', 0)
+        # 每个试验的结果已由Optuna日志输出，默认不再逐试验打印
+        self.verbose = config.get('optimization', {}).get('verbose', False)
+        # 已完成试验的指标: (策略类, 参数) -> 指标值，采样器重复提出相同参数时直接返回，不再回测
+        self._trial_cache: Dict[Tuple[type, Tuple[Tuple[str, Any], ...]], float] = {}
+        # 每个策略参数空间对应的 (参数名, trial -> 参数值) 列表，首次试验时构建
+        self._suggesters: Dict[type, List[Tuple[str, Callable[[optuna.Trial], Any]]]] = {}
+        freq = config.get('data_generator', {}).get('frequency', 'D')
+        self.periods_per_year = PERIODS_PER_YEAR.get(freq, 252)
         # 结果保存路径
         self.results_dir = 'results'
         os.makedirs(self.results_dir, exist_ok=True)
+        # 结果文件名包含数据模式，并行优化同一策略的不同数据模式时互不覆盖
+        self.data_mode = config.get('data_generator', {}).get('type', 'monte_carlo')
+
+    def results_path(self, strategy_name: str, suffix: str = 'optimization_results.json') -> str:
+        """
+        优化结果文件的路径: results/{策略}_{数据模式}_{suffix}
+
+        参数:
+            strategy_name: 策略名称
+            suffix: 文件名后缀 (如 'optimization_results.json'、'optimization.png')
+
+        返回:
+            文件路径
+        """
+        return os.path.join(self.results_dir, f"{strategy_name}_{self.data_mode}_{suffix}")
 
     def optimize(self,
                  strategy_name: str,  # Changed from strategy_cls to name for dynamic loading
                  base_data_df: Optional[pd.DataFrame] = None,  # Allow passing base data for generation
                  study_name: Optional[str] = None,
-                 storage_url: Optional[str] = None
+                 storage_url: Optional[Union[str, optuna.storages.BaseStorage]] = None
                  ) -> optuna.Study:
         """
         执行参数优化
@@ -104,7 +148,7 @@ class OptunaOptimizer:
             strategy_name: 要优化的策略名称
             base_data_df: 可选的基础数据，用于模拟数据生成
             study_name: Optuna study的名称 (用于持久化)
-            storage_url: Optuna study的存储URL (例如, 'sqlite:///example.db')
+            storage_url: Optuna study的存储URL (例如, 'sqlite:///example.db') 或存储对象
 
         返回:
             Optuna study 对象包含优化结果
@@ -113,15 +157,14 @@ class OptunaOptimizer:
         param_space = self._get_param_space(StrategyClass)
 
         # 检查是否有已保存的优化结果
-        result_file = os.path.join(self.results_dir, f"{strategy_name}_optimization_results.json")
+        result_file = self.results_path(strategy_name)
         if os.path.exists(result_file) and not storage_url:
             print(f"发现已保存的优化结果: {result_file}")
             print("使用 --force-optimize 参数重新优化")
             
             try:
                 # 加载并显示已保存的优化结果
-                with open(result_file, 'r') as f:
-                    saved_results = json.load(f)
+                saved_results = load_saved_results(result_file)
                 
                 print(f"已保存的最佳参数 ({saved_results['date']}):")
                 for param, value in saved_results['best_params'].items():
@@ -139,17 +182,51 @@ class OptunaOptimizer:
             study_name=study_name or f"{strategy_name}_optimization",
             storage=storage_url,
             direction=self.direction,
+            sampler=self._create_sampler(),
+            pruner=self._create_pruner(),
             load_if_exists=True  # Load if study_name already exists in storage
         )
 
-        # Generate data once or per trial based on config (for simplicity, generate once here)
+        # Generate data once for all trials; without base data the result is cached per data config
         data_generator = get_data_generator(self.config)
-        simulated_data_df = data_generator.generate(base_data=base_data_df)
-
-        study.optimize(
-            lambda trial: self.objective(trial, StrategyClass, param_space, simulated_data_df.copy()),
-            n_trials=self.trials
-        )
+        if base_data_df is None:
+            simulated_data_df = data_generator.generate_cached()
+        else:
+            simulated_data_df = data_generator.generate(base_data=base_data_df)
+        # 缓存的指标只对本次优化使用的数据有效
+        self._trial_cache.clear()
+
+        # 持久化的study可能已有之前运行留下的试验，只补足剩余的试验数
+        finished_states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        n_finished = len(study.get_trials(deepcopy=False, states=finished_states))
+        if n_finished:
+            print(f"study {study.study_name} 已有 {n_finished} 个完成的试验，继续优化")
+
+        if self.sampler == 'grid':
+            # 网格结果逐个登记，中断后study中只有部分试验，以登记完成后的标记判断网格是否已完整执行
+            if not study.user_attrs.get('grid_complete'):
+                self.grid_search(study, StrategyClass, param_space, simulated_data_df)
+        elif n_finished < self.trials:
+            n_remaining = self.trials - n_finished
+            if self.prefilter_top_k and not n_finished:
+                n_remaining -= self.grid_prefilter(study, StrategyClass, param_space, simulated_data_df,
+                                                   min(self.prefilter_top_k, n_remaining))
+            if n_remaining > 0:
+                if self.n_jobs > 1 and storage_url is not None:
+                    self._optimize_parallel(study, strategy_name, simulated_data_df, n_remaining, storage_url)
+                else:
+                    n_threads = 1
+                    if self.n_jobs > 1 and self._use_fast_core(StrategyClass, simulated_data_df):
+                        # 没有共享存储时无法多进程；快速回测核心执行时释放GIL，改为在本进程内多线程执行试验
+                        print(f"未指定持久化存储，使用 {self.n_jobs} 个线程并行执行试验")
+                        n_threads = self.n_jobs
+                    elif self.n_jobs > 1:
+                        print("未指定持久化存储，无法在进程间共享study，改为串行优化")
+                    study.optimize(
+                        lambda trial: self.objective(trial, StrategyClass, param_space, simulated_data_df),
+                        n_trials=n_remaining,
+                        n_jobs=n_threads
+                    )
 
         print(f"优化完成: {strategy_name}.")
         print(f"完成的试验数量: {len(study.trials)}")
@@ -166,6 +243,87 @@ class OptunaOptimizer:
         
         return study
 
+    def _optimize_parallel(self,
+                           study: optuna.Study,
+                           strategy_name: str,
+                           data_df: pd.DataFrame,
+                           n_trials: int,
+                           storage: Union[str, optuna.storages.BaseStorage]) -> None:
+        """
+        在多个进程中并行执行试验
+
+        Optuna自带的 n_jobs 基于线程，回测是CPU密集的纯Python代码，受GIL限制无法加速。
+        这里每个进程各自加载同一个study，通过共享的数据库存储协调，
+        采样器使用不同的种子，constant_liar 避免同时进行的试验探索同一区域。
+        模拟数据按列写入 .npy 文件，子进程以只读内存映射加载，不通过pickle传递。
+        以fork启动子进程时，先在父进程中预热快速回测核心 (见 _warm_up_fast_core)。
+
+        参数:
+            study: 当前study (用于获取名称)
+            strategy_name: 策略名称
+            data_df: 所有试验共用的模拟数据
+            n_trials: 需要执行的试验总数
+            storage: Optuna存储URL或存储对象 (RDBStorage可以序列化后传给子进程)
+        """
+        n_workers = min(self.n_jobs, n_trials)
+        shares = [n_trials // n_workers + (1 if i < n_trials % n_workers else 0) for i in range(n_workers)]
+        print(f"使用 {n_workers} 个进程并行执行 {n_trials} 个试验")
+        shared_dir = os.path.join(DATA_CACHE_DIR, 'shared', f"{study.study_name}_{os.getpid()}")
+        data_handle = share_frame(data_df, shared_dir)
+        try:
+            StrategyClass = get_strategy_class(strategy_name)
+            if multiprocessing.get_start_method() == 'fork' and self._use_fast_core(StrategyClass, data_df):
+                self._warm_up_fast_core(StrategyClass, load_shared_frame(data_handle))
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = [
+                    executor.submit(_optimize_worker, self.config, strategy_name, study.study_name,
+                                    storage, share, self.seed + i, data_handle)
+                    for i, share in enumerate(shares)
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            shutil.rmtree(shared_dir, ignore_errors=True)
+
+    def _warm_up_fast_core(self, strategy_cls: Type[bt.Strategy], data_df: pd.DataFrame) -> None:
+        """
+        以默认参数执行一次快速回测，加载 (必要时编译) 试验会用到的全部Numba函数
+
+        fork出的子进程直接继承已加载的机器码，不必各自从磁盘缓存加载或重新编译。
+        传入的是子进程同样使用的只读内存映射数据，Numba按只读数组生成的特化版本与试验时一致。
+
+        参数:
+            strategy_cls: 策略类 (需提供 compute_signals)
+            data_df: 子进程使用的只读共享数据
+        """
+        self._fast_objective(optuna.trial.FixedTrial({}), strategy_cls, {}, data_df)
+
+    def _create_sampler(self) -> optuna.samplers.BaseSampler:
+        """
+        创建多元TPE采样器
+
+        multivariate/group 让采样器对参数联合建模，constant_liar 使并行提出的一批试验
+        不会重复探索同一区域。
+        """
+        with warnings.catch_warnings():
+            # multivariate/group/constant_liar 在当前Optuna版本中仍标记为实验特性
+            warnings.simplefilter('ignore', optuna.exceptions.ExperimentalWarning)
+            return optuna.samplers.TPESampler(
+                multivariate=True,
+                group=True,
+                constant_liar=True,
+                n_startup_trials=max(10, self.trials // 10),
+                seed=self.seed
+            )
+
+    def _create_pruner(self) -> optuna.pruners.BasePruner:
+        """创建Hyperband剪枝器，资源单位为回测已完成bar的百分比 (见 PruningAnalyzer)"""
+        return optuna.pruners.HyperbandPruner(
+            min_resource=10,
+            max_resource=100,
+            reduction_factor=3
+        )
+
     def save_optimization_results(self, strategy_name: str, study: optuna.Study) -> None:
         """保存优化结果到JSON文件"""
         
@@ -192,10 +350,13 @@ class OptunaOptimizer:
             
             results['trial_records'] = trial_records
             
-            # 保存到文件
-            file_path = os.path.join(self.results_dir, f"{strategy_name}_optimization_results.json")
-            with open(file_path, 'w') as f:
-                json.dump(results, f, indent=2)
+            # 保存到文件: 先写临时文件再原子替换，其他进程不会读到写了一半的文件
+            file_path = self.results_path(strategy_name)
+            tmp_path = f"{file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+            os.replace(tmp_path, file_path)
+            _SAVED_RESULTS[file_path] = (os.stat(file_path).st_mtime_ns, results)
             
             print(f"优化结果已保存到: {file_path}")
         else:
@@ -232,6 +393,264 @@ class OptunaOptimizer:
                 raise ValueError(f"无法确定 {strategy_name} 的参数空间。请在配置中定义它。")
             return space
 
+    def _equity_metric(self, strat: Any) -> Optional[float]:
+        """
+        由FastEquityAnalyzer记录的每根bar组合价值计算优化指标
+
+        参数:
+            strat: 回测结束后的策略实例 (或 optreturn 返回的 OptReturn 对象)
+
+        返回:
+            优化指标的值，无法计算时返回 None
+        """
+        if not hasattr(strat.analyzers, 'equity'):
+            return None
+        equity_analysis = strat.analyzers.equity.get_analysis()
+        if len(equity_analysis['equity']) < 2:
+            return None
+
+        # 指标直接由组合价值数组计算，CAGR的年数只需首尾日期，不构建带时间索引的Series
+        dts = equity_analysis['dt']
+        metric_value = calculate_metrics(equity_analysis['equity'], periods_per_year=self.periods_per_year,
+                                         years=span_in_years(dts[0], dts[-1])).get(self.metric)
+        if metric_value is None or not np.isfinite(metric_value):
+            return None
+        return metric_value
+
+    def _get_grid(self, param_space: Dict[str, Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """
+        将参数空间离散化为网格
+
+        int 参数有 step 时按步长取值，否则在区间内均匀取 grid_points 个点并取整 (区间内的整数较少时取全部整数)；
+        float 参数有 step 时按步长取值 (与 suggest_float 的取值一致: low + k * step，不超过按步长调整后的上限)，
+        否则在区间内均匀取 grid_points 个点；categorical 参数直接使用 choices。
+        """
+        grid = {}
+        for name, p_config in param_space.items():
+            param_type = p_config.get('type')
+            if param_type == 'int':
+                if p_config.get('step'):
+                    grid[name] = list(range(p_config['low'], p_config['high'] + 1, p_config['step']))
+                else:
+                    values = np.linspace(p_config['low'], p_config['high'], self.grid_points)
+                    grid[name] = [int(v) for v in np.unique(np.round(values))]
+            elif param_type == 'float':
+                if p_config.get('step'):
+                    # 区间长度不是步长整数倍时，Optuna把上限调整为最后一个步长点
+                    high = optuna.distributions.FloatDistribution(
+                        p_config['low'], p_config['high'], step=p_config['step']).high
+                    n_steps = int(round((high - p_config['low']) / p_config['step']))
+                    values = np.minimum(np.arange(n_steps + 1) * p_config['step'] + p_config['low'], high)
+                else:
+                    values = np.linspace(p_config['low'], p_config['high'], self.grid_points)
+                grid[name] = [float(v) for v in values]
+            elif param_type == 'categorical':
+                grid[name] = list(p_config['choices'])
+            else:
+                raise ValueError(f"不支持的参数类型 {param_type} (参数: {name})")
+        return grid
+
+    def _get_distributions(self, param_space: Dict[str, Dict[str, Any]]
+                           ) -> Dict[str, optuna.distributions.BaseDistribution]:
+        """将参数空间转换为Optuna分布，用于把网格搜索结果登记到study中"""
+        distributions = {}
+        for name, p_config in param_space.items():
+            param_type = p_config.get('type')
+            if param_type == 'int':
+                distributions[name] = optuna.distributions.IntDistribution(
+                    p_config['low'], p_config['high'], step=p_config.get('step', 1))
+            elif param_type == 'float':
+                distributions[name] = optuna.distributions.FloatDistribution(
+                    p_config['low'], p_config['high'], step=p_config.get('step'))
+            elif param_type == 'categorical':
+                distributions[name] = optuna.distributions.CategoricalDistribution(p_config['choices'])
+        return distributions
+
+    def grid_search(self,
+                    study: optuna.Study,
+                    strategy_cls: Type[bt.Strategy],
+                    param_space: Dict[str, Dict[str, Any]],
+                    data_df: pd.DataFrame) -> None:
+        """
+        遍历整个参数网格，结果由 _record_grid_results 保存并把最好的 grid_top_k 组登记到study中，后续流程与TPE优化一致
+
+        策略提供 compute_signals 时由快速回测核心多线程批量回测 (见 _fast_grid_values)；
+        否则使用 cerebro.optstrategy 在单个Cerebro中遍历，数据源、经纪商和分析器只配置一次，
+        参数组合由backtrader内部的多进程并行回测。
+
+        参数:
+            study: 用于登记结果的Optuna study
+            strategy_cls: 要优化的策略类
+            param_space: 参数空间定义
+            data_df: 回测数据 (Pandas DataFrame)
+        """
+        grid = self._get_grid(param_space)
+        n_combinations = int(np.prod([len(values) for values in grid.values()]))
+
+        if self._use_fast_core(strategy_cls, data_df):
+            print(f"网格搜索: {n_combinations} 个参数组合 (快速回测核心)")
+            combinations = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+            self._record_grid_results(study, strategy_cls, param_space, combinations,
+                                      self._fast_grid_values(strategy_cls, combinations, data_df))
+            return
+
+        print(f"网格搜索: {n_combinations} 个参数组合, maxcpus={self.maxcpus}")
+
+        # 标准观察者 (Broker/Trades/BuySell) 只用于绘图，优化时不添加
+        cerebro = bt.Cerebro(optdatas=True, optreturn=True, stdstats=False)
+        cerebro.adddata(ArrayPandasData(dataname=data_df))
+        cerebro.optstrategy(strategy_cls, **grid)
+
+        backtest_config = self.config.get('backtest', {})
+        cerebro.broker.setcash(backtest_config.get('cash', 100000.0))
+        cerebro.broker.setcommission(commission=backtest_config.get('commission', 0.001))
+        cerebro.addanalyzer(FastEquityAnalyzer, _name='equity')
+
+        # 逐笔交易日志在优化时没有意义，optstrategy的子进程fork时继承关闭状态
+        with silence_strategy_log(strategy_cls):
+            results = cerebro.run(maxcpus=self.maxcpus)
+        combinations = [{name: getattr(strats[0].params, name) for name in grid} for strats in results]
+        self._record_grid_results(study, strategy_cls, param_space, combinations,
+                                  [self._equity_metric(strats[0]) for strats in results])
+
+    def _record_grid_results(self,
+                             study: optuna.Study,
+                             strategy_cls: Type[bt.Strategy],
+                             param_space: Dict[str, Dict[str, Any]],
+                             combinations: List[Dict[str, Any]],
+                             values: List[Optional[float]]) -> None:
+        """
+        保存网格搜索的完整结果，只把指标最好的 grid_top_k 组参数作为已完成的试验登记到study中
+
+        每次 add_trial 都是一次单独的数据库事务，逐个登记上万个组合的耗时远超回测本身，
+        完整的网格结果写入 results/{策略}_{数据模式}_grid.parquet。
+        study中已有的参数组合 (上次运行中断前登记的) 不再重复登记，全部登记后设置 grid_complete 标记。
+
+        参数:
+            study: 用于登记结果的Optuna study
+            strategy_cls: 策略类
+            param_space: 参数空间定义
+            combinations: 参数组合列表
+            values: 与 combinations 一一对应的优化指标，无法计算时为 None
+        """
+        invalid_value = float('-inf') if self.direction == 'maximize' else float('inf')
+        values = [value if value is not None else invalid_value for value in values]
+
+        grid_path = self.results_path(strategy_cls.__name__, 'grid.parquet')
+        tmp_path = f"{grid_path}.{os.getpid()}.tmp"
+        pd.DataFrame(combinations).assign(**{self.metric: values}).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, grid_path)
+        print(f"网格搜索结果已保存到: {grid_path}")
+
+        order = np.argsort(values, kind='stable')
+        if self.direction == 'maximize':
+            order = order[::-1]
+        distributions = self._get_distributions(param_space)
+        registered = {tuple(sorted(trial.params.items()))
+                      for trial in study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,))}
+        for i in order[:self.grid_top_k]:
+            if tuple(sorted(combinations[i].items())) in registered:
+                continue
+            study.add_trial(optuna.trial.create_trial(
+                params=combinations[i],
+                distributions=distributions,
+                value=values[i]
+            ))
+        study.set_user_attr('grid_complete', True)
+
+    def grid_prefilter(self,
+                       study: optuna.Study,
+                       strategy_cls: Type[bt.Strategy],
+                       param_space: Dict[str, Dict[str, Any]],
+                       data_df: pd.DataFrame,
+                       top_k: int) -> int:
+        """
+        用快速回测核心遍历参数网格，把指标最好的 top_k 组参数作为TPE的首批试验登记到study中
+
+        网格由 _get_grid 离散化 (未指定 step 的 int/float 参数取 grid_points 个点)，
+        遍历时已算出的指标与 objective 的结果一致，直接作为已完成的试验登记，不再重复回测，
+        TPE随后在表现好的区域附近继续细化搜索。
+        (不使用 enqueue_trial: 并行的多个进程可能从SQLite存储中取到同一个等待中的试验。)
+        策略不提供 compute_signals 时跳过预筛选。
+
+        参数:
+            study: 要登记试验的Optuna study
+            strategy_cls: 要优化的策略类
+            param_space: 参数空间定义
+            data_df: 回测数据 (Pandas DataFrame)
+            top_k: 登记的参数组合数
+
+        返回:
+            实际登记的试验数
+        """
+        if not self._use_fast_core(strategy_cls, data_df):
+            print(f"{strategy_cls.__name__} 不支持快速回测核心，跳过网格预筛选")
+            return 0
+
+        grid = self._get_grid(param_space)
+        combinations = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+        print(f"网格预筛选: {len(combinations)} 个参数组合, 取最好的 {top_k} 组作为首批试验")
+        scored = [(value, params) for params, value
+                  in zip(combinations, self._fast_grid_values(strategy_cls, combinations, data_df))
+                  if value is not None]
+        scored.sort(key=lambda item: item[0], reverse=self.direction == 'maximize')
+        distributions = self._get_distributions(param_space)
+        for value, params in scored[:top_k]:
+            study.add_trial(optuna.trial.create_trial(params=params, distributions=distributions, value=value))
+        return len(scored[:top_k])
+
+    def _use_fast_core(self, strategy_cls: Type[bt.Strategy], data_df: pd.DataFrame) -> bool:
+        """是否可以用快速回测核心代替Cerebro: 开启了 fast，策略提供 compute_signals 且数据含收盘价"""
+        return self.fast and hasattr(strategy_cls, 'compute_signals') and 'close' in data_df.columns
+
+    def _fast_grid_values(self,
+                          strategy_cls: Type[bt.Strategy],
+                          combinations: List[Dict[str, Any]],
+                          data_df: pd.DataFrame) -> List[Optional[float]]:
+        """
+        将参数组合分批，每批计算信号后由 simulate_batch 一次回测并计算优化指标
+
+        各批在 maxcpus 个线程中同时执行，回测核心执行时释放GIL。
+
+        参数:
+            strategy_cls: 策略类 (需提供 compute_signals)
+            combinations: 参数组合列表
+            data_df: 回测数据 (Pandas DataFrame，只读)
+
+        返回:
+            与 combinations 一一对应的优化指标，无法计算时为 None
+        """
+        defaults = dict(strategy_cls.params._getitems())
+        backtest_config = self.config.get('backtest', {})
+        close = data_df['close'].to_numpy(dtype=np.float64)
+        open_ = data_df['open'].to_numpy(dtype=np.float64) if 'open' in data_df.columns else close
+        years = span_in_years(data_df.index[0], data_df.index[-1])
+
+        def run_batch(batch_params: List[Dict[str, Any]]) -> List[Optional[float]]:
+            batch = [dict(defaults, **params) for params in batch_params]
+            signals = [strategy_cls.compute_signals(close, params) for params in batch]
+            equity = simulate_batch(
+                open_, close,
+                np.array([entries for entries, _ in signals]),
+                np.array([exits for _, exits in signals]),
+                float(backtest_config.get('cash', 100000.0)),
+                float(backtest_config.get('commission', 0.001)),
+                np.array([params['order_percentage'] for params in batch], dtype=np.float64),
+                np.array([params['stop_loss'] for params in batch], dtype=np.float64),
+                np.array([params.get('trailing_stop', 0.0) for params in batch], dtype=np.float64)
+            )
+            metric_values = calculate_metrics_batch(equity, periods_per_year=self.periods_per_year,
+                                                    years=years, axis=1).get(self.metric)
+            if metric_values is None:
+                return [None] * len(batch)
+            return [float(value) if np.isfinite(value) else None for value in metric_values]
+
+        # 组合数较少时也尽量分给所有线程
+        batch_size = max(1, min(_FAST_BATCH_SIZE, -(-len(combinations) // self.maxcpus)))
+        batches = [combinations[start:start + batch_size] for start in range(0, len(combinations), batch_size)]
+        with ThreadPoolExecutor(max_workers=min(self.maxcpus, len(batches)) or 1) as executor:
+            return [value for batch_values in executor.map(run_batch, batches) for value in batch_values]
+
     def objective(self,
                   trial: optuna.Trial,
                   strategy_cls: Type[bt.Strategy],
@@ -245,86 +664,208 @@ class OptunaOptimizer:
             trial: Optuna trial对象
             strategy_cls: 要优化的策略类
             param_space: 参数空间定义
-            data_df: 回测数据 (Pandas DataFrame)
+            data_df: 回测数据 (Pandas DataFrame，只读)
 
         返回:
             优化指标的值 (e.g., Sharpe Ratio)
         """
-        cerebro = bt.Cerebro()
+        suggesters = self._suggesters.get(strategy_cls)
+        if suggesters is None:
+            suggesters = self._suggesters[strategy_cls] = self._build_suggesters(param_space)
+        suggested_params = {name: suggest(trial) for name, suggest in suggesters}
+
+        # 整数或离散参数空间中采样器常会重复提出已评估过的参数，回测是确定性的，直接复用结果
+        key = (strategy_cls, tuple(sorted(suggested_params.items())))
+        if key in self._trial_cache:
+            return self._trial_cache[key]
+        value = self._evaluate(trial, strategy_cls, suggested_params, data_df)
+        self._trial_cache[key] = value
+        return value
+
+    @staticmethod
+    def _build_suggesters(param_space: Dict[str, Dict[str, Any]]
+                          ) -> List[Tuple[str, Callable[[optuna.Trial], Any]]]:
+        """
+        将参数空间转换为 (参数名, trial -> 参数值) 列表，参数类型只在这里判断一次
 
-        data_feed = bt.feeds.PandasData(dataname=data_df.copy())
-        cerebro.adddata(data_feed)
+        参数:
+            param_space: 参数空间定义
 
-        suggested_params = {}
+        返回:
+            按参数空间顺序排列的 (参数名, 采样函数) 列表
+        """
+        suggesters = []
         for name, p_config in param_space.items():
             param_type = p_config.get('type')
+            # 参数值通过默认参数绑定到各自的lambda上 (避免循环变量的延迟绑定)
             if param_type == 'int':
-                suggested_params[name] = trial.suggest_int(name, p_config['low'], p_config['high'], step=p_config.get('step', 1))
+                suggest = (lambda trial, name=name, low=p_config['low'], high=p_config['high'], step=p_config.get('step', 1):
+                           trial.suggest_int(name, low, high, step=step))
             elif param_type == 'float':
-                suggested_params[name] = trial.suggest_float(name, p_config['low'], p_config['high'], step=p_config.get('step'))
+                suggest = (lambda trial, name=name, low=p_config['low'], high=p_config['high'], step=p_config.get('step'):
+                           trial.suggest_float(name, low, high, step=step))
             elif param_type == 'categorical':
-                suggested_params[name] = trial.suggest_categorical(name, p_config['choices'])
+                suggest = (lambda trial, name=name, choices=p_config['choices']:
+                           trial.suggest_categorical(name, choices))
             else:
                 raise ValueError(f"不支持的参数类型 {param_type} (参数: {name})")
+            suggesters.append((name, suggest))
+        return suggesters
 
+    def _evaluate(self,
+                  trial: optuna.Trial,
+                  strategy_cls: Type[bt.Strategy],
+                  suggested_params: Dict[str, Any],
+                  data_df: pd.DataFrame) -> float:
+        """
+        回测一组参数并计算优化指标: 支持时使用快速回测核心，否则运行Cerebro
+
+        参数:
+            trial: Optuna trial对象 (用于报告阶段性指标和剪枝)
+            strategy_cls: 要优化的策略类
+            suggested_params: 本次试验的参数
+            data_df: 回测数据 (Pandas DataFrame，只读)
+
+        返回:
+            优化指标的值 (无法计算时为无效值)；被剪枝时抛出 optuna.TrialPruned
+        """
+        if self._use_fast_core(strategy_cls, data_df):
+            return self._fast_objective(trial, strategy_cls, suggested_params, data_df)
+
+        # 标准观察者 (Broker/Trades/BuySell) 只用于绘图，优化时不添加以省去每根bar的记录开销
+        cerebro = bt.Cerebro(stdstats=False)
+
+        # 数据源只读取DataFrame (start() 时提取为数组)，所有试验共用同一份数据，无需复制
+        data_feed = ArrayPandasData(dataname=data_df)
+        cerebro.adddata(data_feed)
         cerebro.addstrategy(strategy_cls, **suggested_params)
 
         backtest_config = self.config.get('backtest', {})
         cerebro.broker.setcash(backtest_config.get('cash', 100000.0))
         cerebro.broker.setcommission(commission=backtest_config.get('commission', 0.001))
 
-        cerebro.addanalyzer(bt.analyzers.PyFolio, _name='pyfolio')
-        cerebro.addanalyzer(bt.analyzers.SharpeRatio, _name='sharpe', 
-                           riskfreerate=0.0, annualize=True, timeframe=bt.TimeFrame.Days)
-        cerebro.addanalyzer(bt.analyzers.DrawDown, _name='drawdown')
-        cerebro.addanalyzer(bt.analyzers.Returns, _name='returns')
+        # 指标全部由FastEquityAnalyzer记录的组合价值计算，不再添加backtrader自带的指标分析器
+        cerebro.addanalyzer(FastEquityAnalyzer, _name='equity')
+        cerebro.addanalyzer(PruningAnalyzer, _name='pruning', trial=trial, metric=self.metric,
+                            total_bars=len(data_df), periods_per_year=self.periods_per_year)
 
         try:
-            results = cerebro.run()
+            with silence_strategy_log(strategy_cls):
+                results = cerebro.run()
             strat = results[0]
 
-            # 首先尝试使用PyFolio分析器
-            if hasattr(strat.analyzers, 'pyfolio'):
-                portfolio_values_dict = strat.analyzers.pyfolio.get_analysis().get('portfolio_value', {})
-                if portfolio_values_dict:
-                    portfolio_values = pd.Series(list(portfolio_values_dict.values()), 
-                                               index=pd.to_datetime(list(portfolio_values_dict.keys())))
-
-                    if not portfolio_values.empty and len(portfolio_values) >= 2:
-                        freq = self.config.get('data_generator', {}).get('frequency', 'D')
-                        periods_map = {'D': 252, 'H': 252 * 24, 'M': 252 * 24 * 60}
-                        periods_per_year = periods_map.get(freq, 252)
-
-                        all_metrics = calculate_metrics(portfolio_values, periods_per_year=periods_per_year)
-                        metric_value = all_metrics.get(self.metric, None)
-                        
-                        # 确保返回有效值
-                        if metric_value is not None and np.isfinite(metric_value):
-                            print(f"试验 {trial.number} 参数: {suggested_params}, {self.metric}: {metric_value:.4f}")
-                            return metric_value
-
-            # 尝试使用特定分析器
-            if self.metric == 'sharpe_ratio' and hasattr(strat.analyzers, 'sharpe'):
-                sharpe = strat.analyzers.sharpe.get_analysis().get('sharperatio', 0.0)
-                if np.isfinite(sharpe):
-                    print(f"试验 {trial.number} 参数: {suggested_params}, 夏普比率: {sharpe:.4f}")
-                    return sharpe
-                
-            if self.metric == 'max_drawdown' and hasattr(strat.analyzers, 'drawdown'):
-                max_dd = strat.analyzers.drawdown.get_analysis().get('max', {}).get('drawdown', 0.0)
-                if np.isfinite(max_dd):
-                    # 优化最小化回撤 (负值以便在最大化优化方向时使用)
-                    return -max_dd / 100.0  # 转换为小数
-                
-            if self.metric == 'total_return' and hasattr(strat.analyzers, 'returns'):
-                ret = strat.analyzers.returns.get_analysis().get('rtot', 0.0)
-                if np.isfinite(ret): 
-                    return ret
-            
-            # 如果所有方法都失败，则返回一个默认的无效值
+            # 由组合价值序列计算指标
+            metric_value = self._equity_metric(strat)
+            if metric_value is not None:
+                if self.verbose:
+                    print(f"试验 {trial.number} 参数: {suggested_params}, {self.metric}: {metric_value:.4f}")
+                return metric_value
+
+            # 组合价值不足两个或指标无效时返回一个默认的无效值
             print(f"警告: 试验 {trial.number} 无法计算 {self.metric}, 返回无效值")
             return float('-inf') if self.direction == 'maximize' else float('inf')
             
+        except optuna.TrialPruned:
+            # 剪枝信号必须交给Optuna处理，不能当作普通错误转换为无效值
+            raise
         except Exception as e:
             print(f"试验 {trial.number} 出错, 参数 {suggested_params}: {e}")
             return float('-inf') if self.direction == 'maximize' else float('inf')
+
+
+    def _fast_objective(self,
+                        trial: optuna.Trial,
+                        strategy_cls: Type[bt.Strategy],
+                        suggested_params: Dict[str, Any],
+                        data_df: pd.DataFrame) -> float:
+        """
+        用策略的向量化信号 (compute_signals) 和Numba编译的回测核心执行一次试验
+
+        下单、止损和手续费与Cerebro路径一致；每完成约10%的bar按截至当前的组合价值报告一次指标，
+        与 PruningAnalyzer 的报告方式相同。
+
+        参数:
+            trial: Optuna trial对象
+            strategy_cls: 策略类 (需提供 compute_signals)
+            suggested_params: 本次试验的参数
+            data_df: 回测数据 (Pandas DataFrame，只读)
+
+        返回:
+            优化指标的值
+        """
+        params = dict(strategy_cls.params._getitems())
+        params.update(suggested_params)
+        backtest_config = self.config.get('backtest', {})
+        close = data_df['close'].to_numpy(dtype=np.float64)
+        open_ = data_df['open'].to_numpy(dtype=np.float64) if 'open' in data_df.columns else close
+
+        def on_checkpoint(step: int, equity_so_far: np.ndarray) -> bool:
+            value = calculate_metrics(equity_so_far, periods_per_year=self.periods_per_year).get(self.metric)
+            if value is None or not np.isfinite(value):
+                return False
+            trial.report(value, step)
+            return trial.should_prune()
+
+        try:
+            entries, exits = strategy_cls.compute_signals(close, params)
+            equity, _, _, _ = simulate_with_checkpoints(
+                open_, close, entries, exits,
+                float(backtest_config.get('cash', 100000.0)),
+                float(backtest_config.get('commission', 0.001)),
+                float(params['order_percentage']),
+                float(params['stop_loss']),
+                float(params.get('trailing_stop', 0.0)),
+                on_checkpoint=on_checkpoint
+            )
+        except Exception as e:
+            print(f"试验 {trial.number} 出错, 参数 {suggested_params}: {e}")
+            return float('-inf') if self.direction == 'maximize' else float('inf')
+        if equity.size < close.size:
+            raise optuna.TrialPruned(f"在完成 {100 * equity.size // close.size}% 的bar时被剪枝")
+
+        metric_value = None
+        if equity.size >= 2:
+            metric_value = calculate_metrics(equity, periods_per_year=self.periods_per_year,
+                                             years=span_in_years(data_df.index[0], data_df.index[-1])).get(self.metric)
+        if metric_value is None or not np.isfinite(metric_value):
+            print(f"警告: 试验 {trial.number} 无法计算 {self.metric}, 返回无效值")
+            return float('-inf') if self.direction == 'maximize' else float('inf')
+        if self.verbose:
+            print(f"试验 {trial.number} 参数: {suggested_params}, {self.metric}: {metric_value:.4f}")
+        return metric_value
+
+
+def _optimize_worker(config: Dict[str, Any],
+                     strategy_name: str,
+                     study_name: str,
+                     storage: Union[str, optuna.storages.BaseStorage],
+                     n_trials: int,
+                     seed: int,
+                     data_handle: Dict[str, Any]) -> None:
+    """
+    并行优化的子进程入口: 加载共享存储中的study，执行分配到的试验
+
+    参数:
+        config: 完整配置字典
+        strategy_name: 策略名称
+        study_name: study名称
+        storage: Optuna存储URL或存储对象
+        n_trials: 本进程执行的试验数
+        seed: 本进程采样器的随机种子
+        data_handle: 所有试验共用的模拟数据 (share_frame 返回的句柄)
+    """
+    data_df = load_shared_frame(data_handle)
+    optimizer = OptunaOptimizer(config)
+    optimizer.seed = seed
+    StrategyClass = get_strategy_class(strategy_name)
+    param_space = optimizer._get_param_space(StrategyClass)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=storage,
+        sampler=optimizer._create_sampler(),
+        pruner=optimizer._create_pruner()
+    )
+    study.optimize(
+        lambda trial: optimizer.objective(trial, StrategyClass, param_space, data_df),
+        n_trials=n_trials
+    )
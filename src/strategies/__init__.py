@@ -1,9 +1,44 @@
+import contextlib
+import backtrader as bt
+from typing import Dict, Iterator, Type
+
 from .sample_strategy import SampleStrategy
 from .dual_moving_average_strategy import DualMovingAverageStrategy
 from .mean_reversion_strategy import MeanReversionStrategy
 from .momentum_strategy import MomentumStrategy
 
+# 策略名称 (config中的 strategies.type) 到策略类的注册表，回测与优化共用
+STRATEGY_REGISTRY: Dict[str, Type[bt.Strategy]] = {
+    'SampleStrategy': SampleStrategy,
+    'DualMovingAverageStrategy': DualMovingAverageStrategy,
+    'MeanReversionStrategy': MeanReversionStrategy,
+    'MomentumStrategy': MomentumStrategy,
+}
+
+
+@contextlib.contextmanager
+def silence_strategy_log(strategy_cls: Type[bt.Strategy]) -> Iterator[None]:
+    """
+    在上下文中关闭策略的 log() 输出，退出时恢复原设置
+
+    参数优化时每个试验都要完整回测一遍，逐笔交易的日志只会拖慢回测、淹没优化进度。
+
+    参数:
+        strategy_cls: 策略类 (没有 log_enabled 属性的策略不受影响)
+    """
+    previous = strategy_cls.__dict__.get('log_enabled')
+    strategy_cls.log_enabled = False
+    try:
+        yield
+    finally:
+        if previous is None:
+            del strategy_cls.log_enabled
+        else:
+            strategy_cls.log_enabled = previous
+
 __all__ = [
+    'STRATEGY_REGISTRY',
+    'silence_strategy_log',
     'SampleStrategy',
     'DualMovingAverageStrategy',
     'MeanReversionStrategy',
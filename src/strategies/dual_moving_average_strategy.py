@@ -1,4 +1,8 @@
 import backtrader as bt
+import numpy as np
+from typing import Dict, Any, Tuple
+
+from src.backtest.fast_core import crossover, rolling_mean
 
 class DualMovingAverageStrategy(bt.Strategy):
     """
@@ -15,9 +19,25 @@ class DualMovingAverageStrategy(bt.Strategy):
         self.short_ma = bt.indicators.SimpleMovingAverage(self.datas[0], period=self.params.short_window)
         self.long_ma = bt.indicators.SimpleMovingAverage(self.datas[0], period=self.params.long_window)
         self.crossover = bt.indicators.CrossOver(self.short_ma, self.long_ma)
+        self.data_close = self.datas[0].close
         self.order = None
         self.buy_price = None
 
+    @staticmethod
+    def compute_signals(close: np.ndarray, params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        与 next() 等价的向量化买卖信号，供快速回测核心使用 (下单数量和止损由回测核心处理)
+
+        参数:
+            close: 收盘价序列
+            params: 策略参数 (已合并默认值)
+
+        返回:
+            (买入信号, 卖出信号) 布尔数组
+        """
+        cross = crossover(rolling_mean(close, int(params['short_window'])), rolling_mean(close, int(params['long_window'])))
+        return cross > 0, cross < 0
+
     def notify_order(self, order):
         if order.status in [order.Completed]:
             if order.isbuy():
@@ -28,12 +48,13 @@ class DualMovingAverageStrategy(bt.Strategy):
         if self.order:
             return
 
+        current_price = self.data_close[0]
         if not self.position:
             if self.crossover > 0:  # 短期均线上穿长期均线
-                size = int(self.broker.get_cash() / self.datas[0].close[0] * self.params.order_percentage)
+                size = int(self.broker.get_cash() / current_price * self.params.order_percentage)
                 self.order = self.buy(size=size)
                 if self.buy_price is None:
-                    self.buy_price = self.datas[0].close[0]
+                    self.buy_price = current_price
         else:
-            if self.crossover < 0 or self.datas[0].close[0] < self.buy_price * (1 - self.params.stop_loss):
+            if self.crossover < 0 or current_price < self.buy_price * (1 - self.params.stop_loss):
                 self.order = self.sell(size=self.position.size)
\ No newline at end of file
@@ -1,6 +1,8 @@
 import backtrader as bt
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+from src.backtest.fast_core import rolling_mean, rolling_std
 
 class MeanReversionStrategy(bt.Strategy):
     """
@@ -18,8 +20,13 @@ class MeanReversionStrategy(bt.Strategy):
         ('stop_loss', 0.05),     # 止损比例
     )
     
+    # 是否输出交易日志，参数优化等批量回测时由 silence_strategy_log 暂时关闭
+    log_enabled = True
+
     def log(self, txt, dt=None):
         """记录日志"""
+        if not self.log_enabled:
+            return
         dt = dt or self.datas[0].datetime.date(0)
         print(f'{dt.isoformat()} {txt}')
         
@@ -39,16 +46,32 @@ class MeanReversionStrategy(bt.Strategy):
         # 跟踪当前持仓状态
         self.in_position = False
         
-        # 计算布林带
-        self.bbands = bt.indicators.BollingerBands(
-            self.datas[0].close, period=self.params.lookback
+        # 滚动标准差 (即布林带的带宽因子) 直接复用上面的均线，不再由布林带重复计算一遍均线和上下轨
+        std_dev = bt.indicators.StandardDeviation(
+            self.datas[0].close, self.sma, period=self.params.lookback
         )
         
         # 价格与均值的偏离度
-        # 布林带的标准差是top和mid之间的差除以2
-        std_dev = (self.bbands.lines.top - self.bbands.lines.mid) / 2.0
         self.deviation = (self.datas[0].close - self.sma) / std_dev
 
+    @staticmethod
+    def compute_signals(close: np.ndarray, params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        与 next() 等价的向量化买卖信号，供快速回测核心使用 (下单数量和止损由回测核心处理)
+
+        参数:
+            close: 收盘价序列
+            params: 策略参数 (已合并默认值)
+
+        返回:
+            (买入信号, 卖出信号) 布尔数组
+        """
+        lookback = int(params['lookback'])
+        # 布林带 (top - mid) / 2 即为总体标准差
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deviation = (close - rolling_mean(close, lookback)) / rolling_std(close, lookback)
+        return deviation < -params['entry_std'], deviation > params['exit_std']
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             # 订单已提交/已接受 - 无需操作
@@ -85,21 +108,21 @@ class MeanReversionStrategy(bt.Strategy):
         if self.order:
             return
 
-        # 计算当前价格与均值的偏离度
+        # 计算当前价格与均值的偏离度，当前价格每根bar只从数据线读取一次
         current_deviation = self.deviation[0]
+        current_price = self.data_close[0]
         
         # 如果没有持仓
         if not self.position:
             # 当价格显著低于均值时买入（负偏离度大于入场阈值）
             if current_deviation < -self.params.entry_std:
-                size = int(self.broker.get_cash() / self.datas[0].close[0] * self.params.order_percentage)
+                size = int(self.broker.get_cash() / current_price * self.params.order_percentage)
                 if size > 0:
-                    self.log(f'买入信号 (偏离度: {current_deviation:.2f}), 价格: {self.datas[0].close[0]:.2f}')
+                    self.log(f'买入信号 (偏离度: {current_deviation:.2f}), 价格: {current_price:.2f}')
                     self.order = self.buy(size=size)
-                    self.buy_price = self.datas[0].close[0]
+                    self.buy_price = current_price
         else:
             # 计算当前亏损比例
-            current_price = self.datas[0].close[0]
             if self.buy_price is None:  # 安全检查
                 self.buy_price = self.position.price
             
@@ -1,6 +1,8 @@
 import backtrader as bt
 import numpy as np
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+
+from src.backtest.fast_core import crossover, ema
 
 class MomentumStrategy(bt.Strategy):
     """
@@ -18,8 +20,13 @@ class MomentumStrategy(bt.Strategy):
         ('trailing_stop', 0.02),   # 跟踪止损比例
     )
     
+    # 是否输出交易日志，参数优化等批量回测时由 silence_strategy_log 暂时关闭
+    log_enabled = True
+
     def log(self, txt, dt=None):
         """记录日志"""
+        if not self.log_enabled:
+            return
         dt = dt or self.datas[0].datetime.date(0)
         print(f'{dt.isoformat()} {txt}')
         
@@ -33,6 +40,7 @@ class MomentumStrategy(bt.Strategy):
         
         # 动量指标的交叉信号
         self.crossover = bt.indicators.CrossOver(self.roc, 0)
+        self.data_close = self.datas[0].close
         
         # 交易相关变量
         self.order = None
@@ -42,6 +50,26 @@ class MomentumStrategy(bt.Strategy):
         # 跟踪止损价格
         self.trailing_stop_price = 0
         
+    @staticmethod
+    def compute_signals(close: np.ndarray, params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        与 next() 等价的向量化买卖信号，供快速回测核心使用 (下单数量和止损由回测核心处理)
+
+        参数:
+            close: 收盘价序列
+            params: 策略参数 (已合并默认值)
+
+        返回:
+            (买入信号, 卖出信号) 布尔数组
+        """
+        period = int(params['momentum_period'])
+        roc = np.full(close.size, np.nan)
+        roc[period:] = (close[period:] - close[:-period]) / close[:-period]
+        signal = ema(roc, int(params['signal_period']))
+        cross = crossover(roc, np.zeros(close.size))
+        # 固定止损价不高于跟踪止损的初始值，由回测核心的跟踪止损一并处理
+        return (cross > 0) & (signal > 0), (cross < 0) & (signal < 0)
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             # 订单已提交/已接受 - 无需操作
@@ -80,7 +108,7 @@ class MomentumStrategy(bt.Strategy):
             return
 
         # 当前价格
-        current_price = self.datas[0].close[0]
+        current_price = self.data_close[0]
         
         # 如果没有持仓
         if not self.position:
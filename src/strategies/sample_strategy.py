@@ -1,5 +1,8 @@
 import backtrader as bt
-from typing import Dict, Any
+import numpy as np
+from typing import Dict, Any, Tuple
+
+from src.backtest.fast_core import crossover, rolling_mean
 
 class SampleStrategy(bt.Strategy):
     """
@@ -13,8 +16,13 @@ class SampleStrategy(bt.Strategy):
         ('stop_loss', 0.05),
     )
     
+    # 是否输出交易日志，参数优化等批量回测时由 silence_strategy_log 暂时关闭
+    log_enabled = True
+
     def log(self, txt, dt=None):
         """记录日志"""
+        if not self.log_enabled:
+            return
         dt = dt or self.datas[0].datetime.date(0)
         print(f'{dt.isoformat()} {txt}')
         
@@ -27,10 +35,26 @@ class SampleStrategy(bt.Strategy):
             self.datas[0], period=self.params.slow_period
         )
         self.crossover = bt.indicators.CrossOver(self.sma_fast, self.sma_slow)
+        self.data_close = self.datas[0].close
         self.order = None
         self.buy_price = None
         self.buy_comm = None
 
+    @staticmethod
+    def compute_signals(close: np.ndarray, params: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        与 next() 等价的向量化买卖信号，供快速回测核心使用 (下单数量和止损由回测核心处理)
+
+        参数:
+            close: 收盘价序列
+            params: 策略参数 (已合并默认值)
+
+        返回:
+            (买入信号, 卖出信号) 布尔数组
+        """
+        cross = crossover(rolling_mean(close, int(params['fast_period'])), rolling_mean(close, int(params['slow_period'])))
+        return cross > 0, cross < 0
+
     def notify_order(self, order):
         if order.status in [order.Submitted, order.Accepted]:
             # Buy/Sell order submitted/accepted to/by broker - Nothing to do
@@ -66,18 +90,20 @@ class SampleStrategy(bt.Strategy):
         if self.order:
             return
 
+        # 当前收盘价每根bar只从数据线读取一次
+        current_price = self.data_close[0]
+
         # Check if we are in the market
         if not self.position:
             if self.crossover > 0:  # Fast SMA > Slow SMA, buy signal
-                size = int(self.broker.get_cash() / self.datas[0].close[0] * self.params.order_percentage)
+                size = int(self.broker.get_cash() / current_price * self.params.order_percentage)
                 if size > 0:  # 确保有足够的资金下单
-                    self.log(f'BUY CREATE, {self.datas[0].close[0]:.2f}')
+                    self.log(f'BUY CREATE, {current_price:.2f}')
                     self.order = self.buy(size=size)
                     # 设置初始buy_price，以防notify_order失败
-                    self.buy_price = self.datas[0].close[0]
+                    self.buy_price = current_price
         else:
             # 不管是卖出信号还是止损，都计算当前的亏损百分比
-            current_price = self.datas[0].close[0]
             if self.buy_price is None:  # 安全检查
                 self.buy_price = self.position.price
             
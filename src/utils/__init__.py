@@ -2,12 +2,19 @@ from .metrics import (
     calculate_sharpe_ratio,
     calculate_max_drawdown,
     calculate_sortino_ratio,
-    calculate_metrics
+    calculate_metrics,
+    calculate_metrics_batch,
+    span_in_years,
+    warm_up_metric_kernels,
+    PERIODS_PER_YEAR
 )
-from .visualizer import (
-    plot_equity_curve,
-    plot_drawdown,
-    plot_optimization_results
+from .config import load_config, fast_clone
+
+# 绘图函数依赖matplotlib/plotly，首次访问时才导入visualizer
+_VISUALIZER_EXPORTS = (
+    'plot_equity_curve',
+    'plot_drawdown',
+    'plot_optimization_results'
 )
 
 __all__ = [
@@ -15,7 +22,20 @@ __all__ = [
     'calculate_max_drawdown',
     'calculate_sortino_ratio',
     'calculate_metrics',
+    'calculate_metrics_batch',
+    'span_in_years',
+    'warm_up_metric_kernels',
+    'PERIODS_PER_YEAR',
+    'load_config',
+    'fast_clone',
     'plot_equity_curve',
     'plot_drawdown',
     'plot_optimization_results'
 ]
+
+
+def __getattr__(name):
+    if name in _VISUALIZER_EXPORTS:
+        from . import visualizer
+        return getattr(visualizer, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
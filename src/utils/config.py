@@ -0,0 +1,49 @@
+import os
+import orjson
+import yaml
+from typing import Dict, Any, Tuple
+
+# 优先使用libyaml的C实现解析器，未编译libyaml时回退到纯Python实现
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+# 已解析的配置缓存: (绝对路径, 修改时间) -> 配置字典
+_CONFIG_CACHE: Dict[Tuple[str, float], Dict[str, Any]] = {}
+
+
+def fast_clone(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    通过orjson序列化往返快速深拷贝配置字典，比copy.deepcopy快得多
+
+    参数:
+        config: 配置字典（YAML来源，元组会被转换为列表）
+
+    返回:
+        配置字典的独立副本
+    """
+    return orjson.loads(orjson.dumps(config))
+
+
+def load_config(config_path: str) -> Dict[str, Any]:
+    """
+    加载YAML配置文件，同一文件未修改时直接复用已解析的结果
+
+    参数:
+        config_path: 配置文件路径
+
+    返回:
+        配置字典（每次返回独立副本，调用方可以放心修改）
+    """
+    abs_path = os.path.abspath(config_path)
+    key = (abs_path, os.path.getmtime(abs_path))
+
+    config = _CONFIG_CACHE.get(key)
+    if config is None:
+        with open(abs_path, 'r') as file:
+            config = yaml.load(file, Loader=_YamlLoader) or {}
+        _CONFIG_CACHE[key] = config
+
+    return fast_clone(config)
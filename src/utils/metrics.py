@@ -1,68 +1,136 @@
+import math
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, List
+from numba import njit
+from typing import Dict, Any, List, Optional, Tuple, Union
 
-def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.0, periods_per_year: int = 252) -> float:
+# 数据频率 (data_generator.frequency) 对应的每年周期数，未知频率按日线处理
+PERIODS_PER_YEAR: Dict[str, int] = {'D': 252, 'H': 252 * 24, 'M': 252 * 24 * 60}
+
+def _as_float_array(values: Union[pd.Series, np.ndarray]) -> np.ndarray:
+    """Series取其底层数据，数组直接使用 (已是float64时不拷贝)，统一为float64数组"""
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+def _fill_nan(values: np.ndarray) -> np.ndarray:
+    """
+    组合价值的NaN先前向再后向填充；没有NaN时直接返回原数组，不做任何拷贝
+
+    参数:
+        values: 组合价值 (float64)
+
+    返回:
+        填充后的组合价值
+    """
+    if np.isnan(values).any():
+        return pd.Series(values).ffill().bfill().to_numpy()
+    return values
+
+def _cagr(start_value: float, end_value: float, years: float) -> float:
+    """
+    由起止价值和年数计算CAGR，起始价值非正、年数非正或结果无效时为0
+
+    参数:
+        start_value: 起始价值
+        end_value: 最终价值
+        years: 投资时间长度 (以年为单位)
+
+    返回:
+        CAGR
+    """
+    if start_value <= 0 or years <= 0:
+        return 0.0
+    cagr = (end_value / start_value) ** (1 / years) - 1
+    return cagr if math.isfinite(cagr) else 0.0
+
+def calculate_sharpe_ratio(returns: Union[pd.Series, np.ndarray], risk_free_rate: float = 0.0, periods_per_year: int = 252) -> float:
     """
     计算夏普比率
     
     参数:
-        returns: 收益率序列 (pandas Series)
+        returns: 收益率序列 (pandas Series，或numpy数组)
         risk_free_rate: 年化无风险利率
         periods_per_year: 每年的周期数 (例如，日收益率为252，月收益率为12)
         
     返回:
         年化夏普比率
     """
-    if returns.empty or len(returns) < 2:
+    if len(returns) < 2:
         return 0.0
     
+    # 标量统计直接在numpy数组上计算，不构建中间Series
     # 处理NaN值
-    returns = returns.fillna(0)
+    arr = _as_float_array(returns)
+    arr = np.where(np.isnan(arr), 0.0, arr)
     
-    excess_returns = returns - (risk_free_rate / periods_per_year)
+    excess_returns = arr - (risk_free_rate / periods_per_year)
     
     # 计算标准差前先检查
-    std = excess_returns.std()
+    std = excess_returns.std(ddof=1)
     if std == 0:
         return 0.0  # 如果波动率为0，夏普比率也为0
         
     sharpe_ratio = excess_returns.mean() / std
     return sharpe_ratio * np.sqrt(periods_per_year) # Annualize
 
-def calculate_max_drawdown(portfolio_values: pd.Series) -> float:
+def calculate_max_drawdown(portfolio_values: Union[pd.Series, np.ndarray]) -> float:
     """
     计算最大回撤
     
     参数:
-        portfolio_values: 投资组合价值序列 (pandas Series)
+        portfolio_values: 投资组合价值序列 (pandas Series，或numpy数组)
         
     返回:
         最大回撤 (百分比, e.g., 0.1 for 10% drawdown)
     """
-    if portfolio_values.empty or len(portfolio_values) < 2:
+    if len(portfolio_values) < 2:
         return 0.0
     
     # 处理NaN值
-    portfolio_values = portfolio_values.ffill().bfill()
-    
-    # 计算最大回撤
-    cumulative_max = portfolio_values.cummax()
-    drawdowns = (portfolio_values - cumulative_max) / cumulative_max
-    max_drawdown = drawdowns.min()
-    
+    values = _fill_nan(_as_float_array(portfolio_values))
+
+    # 计算最大回撤 (单次遍历，不生成滚动最高点和回撤序列)
+    max_drawdown = _min_drawdown(values)
+
     # 检查是否是有效值
-    if pd.isna(max_drawdown):
+    if math.isnan(max_drawdown):
         return 0.0
-        
+
     return abs(max_drawdown)
 
-def calculate_sortino_ratio(returns: pd.Series, risk_free_rate: float = 0.0, periods_per_year: int = 252, target_return: float = 0.0) -> float:
+@njit(cache=True, error_model='numpy', nogil=True)
+def _min_drawdown(values: np.ndarray) -> float:
+    """
+    单次遍历组合价值，维护滚动最高点并记录最小(最深)的回撤
+
+    与 pandas 的 cummax 后 min 一致: NaN值不更新最高点，NaN回撤被跳过。
+
+    参数:
+        values: 组合价值 (float64)
+
+    返回:
+        最小回撤 (非正数)，没有有效回撤时为NaN
+    """
+    running_max = np.nan
+    min_dd = np.nan
+    for i in range(values.size):
+        v = values[i]
+        if np.isnan(v):
+            continue
+        if np.isnan(running_max) or v > running_max:
+            running_max = v
+        dd = (v - running_max) / running_max
+        if not np.isnan(dd) and (np.isnan(min_dd) or dd < min_dd):
+            min_dd = dd
+    return min_dd
+
+def calculate_sortino_ratio(returns: Union[pd.Series, np.ndarray], risk_free_rate: float = 0.0, periods_per_year: int = 252, target_return: float = 0.0) -> float:
     """
     计算索提诺比率
     
     参数:
-        returns: 收益率序列 (pandas Series)
+        returns: 收益率序列 (pandas Series，或numpy数组)
         risk_free_rate: 年化无风险利率
         periods_per_year: 每年的周期数
         target_return: 目标收益率 (年化, 用于计算下行偏差)
@@ -70,72 +138,177 @@ def calculate_sortino_ratio(returns: pd.Series, risk_free_rate: float = 0.0, per
     返回:
         年化索提诺比率
     """
-    if returns.empty:
+    if len(returns) == 0:
         return 0.0
     
-    # Calculate excess returns over the target return
-    excess_returns = returns - (target_return / periods_per_year)
-    # Calculate downside deviation
-    downside_returns = excess_returns[excess_returns < 0]
-    if downside_returns.empty or downside_returns.std() == 0:
-        return np.inf if excess_returns.mean() > 0 else 0.0 # Avoid division by zero; if mean is positive, it's infinitely good by this measure
-        
-    downside_deviation = downside_returns.std()
+    # 超额收益的均值、下行偏差一次遍历算出，不生成超额收益和下行收益数组
+    mean_return, mean_excess, n_down, downside_deviation = _downside_stats(
+        _as_float_array(returns), target_return / periods_per_year)
+    if n_down == 0 or downside_deviation == 0:
+        return np.inf if mean_excess > 0 else 0.0 # Avoid division by zero; if mean is positive, it's infinitely good by this measure
     
     # Calculate Sortino Ratio
-    sortino_ratio = (returns.mean() - (risk_free_rate / periods_per_year)) / downside_deviation
+    sortino_ratio = (mean_return - (risk_free_rate / periods_per_year)) / downside_deviation
     return sortino_ratio * np.sqrt(periods_per_year) # Annualize
 
-def calculate_cagr(portfolio_values: pd.Series, periods_per_year: int = 252) -> float:
+@njit(cache=True, error_model='numpy', nogil=True)
+def _downside_stats(returns: np.ndarray, target: float) -> Tuple[float, float, int, float]:
+    """
+    单次遍历收益率，计算收益率均值、超额收益均值和低于目标收益率部分的样本标准差
+
+    与 pandas 一致跳过NaN；下行收益率的方差按Welford算法逐步更新。
+
+    参数:
+        returns: 收益率 (float64)
+        target: 每期目标收益率
+
+    返回:
+        (收益率均值, 超额收益均值, 下行收益个数, 下行收益样本标准差)；
+        没有有效收益率时均值为NaN，下行收益少于2个时标准差为NaN
+    """
+    n_valid = 0
+    sum_ret = 0.0
+    sum_excess = 0.0
+    n_down = 0
+    mean_down = 0.0
+    m2_down = 0.0
+    for i in range(returns.size):
+        ret = returns[i]
+        if np.isnan(ret):
+            continue
+        excess = ret - target
+        n_valid += 1
+        sum_ret += ret
+        sum_excess += excess
+        if excess < 0:
+            n_down += 1
+            delta = excess - mean_down
+            mean_down += delta / n_down
+            m2_down += delta * (excess - mean_down)
+    mean_ret = np.nan
+    mean_excess = np.nan
+    if n_valid > 0:
+        mean_ret = sum_ret / n_valid
+        mean_excess = sum_excess / n_valid
+    down_std = np.nan
+    if n_down > 1:
+        down_std = np.sqrt(m2_down / (n_down - 1))
+    return mean_ret, mean_excess, n_down, down_std
+
+def calculate_cagr(portfolio_values: Union[pd.Series, np.ndarray], periods_per_year: int = 252) -> float:
     """
     计算复合年增长率 (CAGR)
 
     参数:
-        portfolio_values: 投资组合价值序列 (pandas Series)
-        periods_per_year: 每年的周期数
+        portfolio_values: 投资组合价值序列 (带时间索引的pandas Series，或numpy数组)
+        periods_per_year: 每年的周期数 (没有时间戳索引时用于折算年数)
 
     返回:
         CAGR (e.g., 0.1 for 10% CAGR)
     """
-    if portfolio_values.empty or len(portfolio_values) < 2:
+    if len(portfolio_values) < 2:
         return 0.0
     
     # 处理NaN值
-    portfolio_values = portfolio_values.ffill().bfill()
-    
-    start_value = portfolio_values.iloc[0]
-    end_value = portfolio_values.iloc[-1]
+    values = _fill_nan(_as_float_array(portfolio_values))
     
     # 计算投资时间长度（以年为单位）
-    time_diff = (portfolio_values.index[-1] - portfolio_values.index[0]).total_seconds()
-    years = time_diff / (365.25 * 24 * 60 * 60)  # 转换为年
-    
-    # 安全检查
-    if start_value <= 0 or years <= 0:
-        return 0.0
-    
-    # 计算CAGR
-    cagr = (end_value / start_value) ** (1 / years) - 1
+    index = getattr(portfolio_values, 'index', None)
+    if isinstance(index, pd.DatetimeIndex):
+        # 直接在datetime64上相减，不构造Timestamp/Timedelta对象 (结果与 total_seconds() 相同)
+        stamps = index.values
+        time_diff = (stamps[-1] - stamps[0]) / np.timedelta64(1, 's')
+        years = time_diff / (365.25 * 24 * 60 * 60)  # 转换为年
+    else:
+        # 没有时间戳时按周期数折算，与 calculate_metrics 一致
+        years = (len(values) - 1) / periods_per_year
     
-    # 检查是否是有效值
-    if pd.isna(cagr) or np.isinf(cagr):
-        return 0.0
-        
-    return cagr
+    # 计算CAGR (起始价值或年数非正、结果无效时为0)
+    return _cagr(values[0], values[-1], years)
 
-def calculate_metrics(portfolio_values: pd.Series, risk_free_rate: float = 0.0, periods_per_year: int = 252) -> Dict[str, float]:
+def span_in_years(start: Any, end: Any) -> float:
+    """
+    计算两个时间戳之间的时间长度 (以年为单位)，CAGR按此年化
+
+    参数:
+        start: 起始时间戳 (pandas Timestamp 或 numpy datetime64)
+        end: 结束时间戳
+
+    返回:
+        年数
+    """
+    return (pd.Timestamp(end) - pd.Timestamp(start)).total_seconds() / (365.25 * 24 * 60 * 60)
+
+@njit(cache=True, error_model='numpy', nogil=True)
+def _fused_equity_stats(values: np.ndarray) -> Tuple[float, float, float, float]:
+    """
+    单次遍历组合价值，同时更新收益率的均值/方差、下行收益率的方差和滚动最高点
+
+    收益率与 calculate_metrics 的约定一致: 首个周期收益率为0，0/0产生的NaN收益率按0处理。
+    均值和方差按Welford算法逐步更新，避免 sum(r^2) - sum(r)^2/n 在收益率波动很小时的相消误差
+    (近乎平坦的权益曲线不会因此得到虚假的微小标准差)。
+
+    参数:
+        values: 组合价值 (float64，已填充NaN，长度至少为2)
+
+    返回:
+        (收益率均值, 收益率样本标准差, 最大回撤(NaN表示无法计算), 下行收益率样本标准差)
+    """
+    n = values.size
+    # 首个周期收益率为0，已计入均值
+    mean = 0.0
+    m2 = 0.0
+    n_down = 0
+    mean_down = 0.0
+    m2_down = 0.0
+    running_max = values[0]
+    min_dd = (values[0] - running_max) / running_max
+    for i in range(1, n):
+        ret = values[i] / values[i - 1] - 1.0
+        if np.isnan(ret):
+            ret = 0.0
+        delta = ret - mean
+        mean += delta / (i + 1)
+        m2 += delta * (ret - mean)
+        if ret < 0:
+            n_down += 1
+            delta = ret - mean_down
+            mean_down += delta / n_down
+            m2_down += delta * (ret - mean_down)
+
+        if values[i] > running_max:
+            running_max = values[i]
+        # 与 np.min 一致: 一旦出现NaN回撤，结果即为NaN
+        if not np.isnan(min_dd):
+            dd = (values[i] - running_max) / running_max
+            if np.isnan(dd) or dd < min_dd:
+                min_dd = dd
+
+    std = np.sqrt(m2 / (n - 1))
+    down_std = 0.0
+    if n_down > 1:
+        down_std = np.sqrt(m2_down / (n_down - 1))
+    return mean, std, min_dd, down_std
+
+def calculate_metrics(portfolio_values: Union[pd.Series, np.ndarray], risk_free_rate: float = 0.0, periods_per_year: int = 252,
+                      years: Optional[float] = None) -> Dict[str, float]:
     """
     计算一系列性能指标
+
+    收益率统计量、最大回撤和下行偏差由Numba编译的单次遍历一并算出，
+    不生成收益率、回撤等中间数组。
     
     参数:
-        portfolio_values: 投资组合价值序列 (pandas Series)
+        portfolio_values: 投资组合价值序列 (pandas Series，或按周期排列的numpy数组)
         risk_free_rate: 年化无风险利率
         periods_per_year: 每年的周期数
+        years: 投资时间长度 (以年为单位，用于计算CAGR)；为None时按Series首尾时间戳或数组的周期数推算，
+               已知起止时间时直接传入numpy数组和年数，无需构建带时间索引的Series
         
     返回:
         包含各种性能指标的字典
     """
-    if portfolio_values.empty or len(portfolio_values) < 2:
+    if len(portfolio_values) < 2:
         return {
             'cagr': 0.0,
             'sharpe_ratio': 0.0,
@@ -145,38 +318,143 @@ def calculate_metrics(portfolio_values: pd.Series, risk_free_rate: float = 0.0,
             'volatility': 0.0
         }
     
+    values = _as_float_array(portfolio_values)
+    if years is None:
+        if isinstance(portfolio_values, pd.Series):
+            # 投资时间长度（以年为单位）按首尾时间戳计算
+            years = span_in_years(portfolio_values.index[0], portfolio_values.index[-1])
+        else:
+            # 没有时间戳时按周期数折算
+            years = (len(values) - 1) / periods_per_year
+    
     # 处理NaN值
-    portfolio_values = portfolio_values.ffill().bfill()
+    values = _fill_nan(values)
     
-    # 计算收益率
-    returns = portfolio_values.pct_change().fillna(0)
+    start_value = values[0]
+    end_value = values[-1]
+    
+    # 收益率均值/标准差、最大回撤、下行标准差在一次遍历中算出
+    mean_return, std_return, max_dd, downside_std = _fused_equity_stats(values)
     
     # 计算总收益率
-    total_return = (portfolio_values.iloc[-1] / portfolio_values.iloc[0]) - 1
+    total_return = end_value / start_value - 1
     
     # 计算年化波动率
-    volatility = returns.std() * np.sqrt(periods_per_year)
-    if pd.isna(volatility) or np.isinf(volatility):
+    volatility = std_return * np.sqrt(periods_per_year)
+    if not math.isfinite(volatility):
         volatility = 0.0
     
-    # 计算各项指标
-    cagr = calculate_cagr(portfolio_values, periods_per_year)
-    sharpe = calculate_sharpe_ratio(returns, risk_free_rate, periods_per_year)
-    max_dd = calculate_max_drawdown(portfolio_values)
+    # 计算CAGR
+    cagr = _cagr(start_value, end_value, years)
+    
+    # 计算夏普比率 (减去常数无风险收益率不改变标准差)
+    period_rf = risk_free_rate / periods_per_year
+    sharpe = 0.0 if std_return == 0 else (mean_return - period_rf) / std_return * np.sqrt(periods_per_year)
+    
+    # 最大回撤
+    max_dd = 0.0 if math.isnan(max_dd) else abs(max_dd)
     
     # 计算索提诺比率（只考虑下行风险）
-    downside_returns = returns[returns < 0]
-    if not downside_returns.empty and downside_returns.std() > 0:
-        sortino_ratio = (returns.mean() - (risk_free_rate / periods_per_year)) / downside_returns.std()
+    if downside_std > 0:
+        sortino_ratio = (mean_return - period_rf) / downside_std
         sortino_ratio = sortino_ratio * np.sqrt(periods_per_year)  # 年化
         
         # 检查有效性
-        if pd.isna(sortino_ratio) or np.isinf(sortino_ratio):
+        if not math.isfinite(sortino_ratio):
             sortino_ratio = 0.0
     else:
-        sortino_ratio = 0.0 if returns.mean() <= 0 else 100.0  # 如果平均收益为正但无下行风险
+        sortino_ratio = 0.0 if mean_return <= 0 else 100.0  # 如果平均收益为正但无下行风险
     
     metrics = {
+        'cagr': float(cagr),
+        'sharpe_ratio': float(sharpe),
+        'max_drawdown': float(max_dd),
+        'sortino_ratio': float(sortino_ratio),
+        'total_return': float(total_return),
+        'volatility': float(volatility)
+    }
+    return metrics
+
+@njit(cache=True, error_model='numpy', nogil=True)
+def _fused_equity_stats_batch(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    对二维数组的每一行 (一个组合的价值曲线) 执行 _fused_equity_stats
+
+    参数:
+        values: 组合价值 (float64，形状 (组合数, 周期数)，已填充NaN，周期数至少为2)
+
+    返回:
+        (收益率均值, 收益率样本标准差, 最大回撤, 下行收益率样本标准差)，每项为长度等于组合数的数组
+    """
+    k = values.shape[0]
+    mean = np.empty(k)
+    std = np.empty(k)
+    min_dd = np.empty(k)
+    down_std = np.empty(k)
+    for j in range(k):
+        mean[j], std[j], min_dd[j], down_std[j] = _fused_equity_stats(values[j])
+    return mean, std, min_dd, down_std
+
+def calculate_metrics_batch(portfolio_values: np.ndarray, risk_free_rate: float = 0.0, periods_per_year: int = 252,
+                            years: Optional[float] = None, axis: int = 0) -> Dict[str, np.ndarray]:
+    """
+    批量计算多个组合的性能指标
+
+    所有组合共用同一时间轴，统计量由一次编译后的循环逐组合算出，其余指标按数组整体计算，
+    每个组合的结果与对其单独调用 calculate_metrics 完全一致。
+
+    参数:
+        portfolio_values: 组合价值二维数组，axis 所在维为时间，另一维为组合
+        risk_free_rate: 年化无风险利率
+        periods_per_year: 每年的周期数
+        years: 投资时间长度 (以年为单位，用于计算CAGR)；为None时按周期数推算
+        axis: 时间所在的维度 (默认0，即形状为 (周期数, 组合数))
+
+    返回:
+        与 calculate_metrics 相同键的字典，每个值为长度等于组合数的数组
+    """
+    values = np.asarray(portfolio_values, dtype=np.float64)
+    # 统一为 (组合数, 周期数)，每个组合的价值曲线在内存中连续
+    values = np.ascontiguousarray(np.moveaxis(values, axis, -1))
+    n_portfolios, n_periods = values.shape
+
+    if n_periods < 2:
+        return {key: np.zeros(n_portfolios) for key in
+                ('cagr', 'sharpe_ratio', 'max_drawdown', 'sortino_ratio', 'total_return', 'volatility')}
+
+    if years is None:
+        years = (n_periods - 1) / periods_per_year
+
+    # 处理NaN值 (逐组合沿时间前向/后向填充)
+    if np.isnan(values).any():
+        values = pd.DataFrame(values).ffill(axis=1).bfill(axis=1).to_numpy()
+
+    start_value = values[:, 0]
+    end_value = values[:, -1]
+
+    mean_return, std_return, max_dd, downside_std = _fused_equity_stats_batch(values)
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        total_return = end_value / start_value - 1
+
+        volatility = std_return * np.sqrt(periods_per_year)
+        volatility[~np.isfinite(volatility)] = 0.0
+
+        # 幂运算逐组合以标量计算，与 calculate_metrics 的结果逐位一致
+        cagr = np.array([_cagr(start, end, years) for start, end in zip(start_value, end_value)], dtype=np.float64)
+
+        period_rf = risk_free_rate / periods_per_year
+        sharpe = np.where(std_return == 0, 0.0, (mean_return - period_rf) / std_return * np.sqrt(periods_per_year))
+
+        max_dd = np.where(np.isnan(max_dd), 0.0, np.abs(max_dd))
+
+        sortino_ratio = (mean_return - period_rf) / downside_std
+        sortino_ratio = sortino_ratio * np.sqrt(periods_per_year)
+        sortino_ratio[~np.isfinite(sortino_ratio)] = 0.0
+        no_downside = ~(downside_std > 0)
+        sortino_ratio[no_downside] = np.where(mean_return[no_downside] <= 0, 0.0, 100.0)
+
+    return {
         'cagr': cagr,
         'sharpe_ratio': sharpe,
         'max_drawdown': max_dd,
@@ -184,4 +462,15 @@ def calculate_metrics(portfolio_values: pd.Series, risk_free_rate: float = 0.0,
         'total_return': total_return,
         'volatility': volatility
     }
-    return metrics
+
+def warm_up_metric_kernels() -> None:
+    """
+    预先加载指标计算用到的Numba内核
+
+    内核以 cache=True 编译，编译结果保存在磁盘上，但每个进程首次调用时仍要初始化Numba并从缓存加载
+    (约0.2秒)。在fork子进程之前于父进程中调用一次，子进程即可直接使用已加载的内核。
+    """
+    values = np.linspace(1.0, 2.0, 3)
+    calculate_metrics(values)
+    calculate_metrics_batch(values[:, None])
+    calculate_max_drawdown(pd.Series(values))
@@ -1,14 +1,25 @@
+import os
 import optuna
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib as mpl
-from typing import Dict, Any, List, Optional
+from matplotlib.axes import Axes
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 import platform
 
+# 字体只需设置一次 (Windows下要解析字体文件)，之后的绘图调用直接跳过
+_FONT_READY = False
+
 # 设置中文字体支持
 def setup_chinese_font():
-    """根据操作系统设置合适的中文字体"""
+    """根据操作系统设置合适的中文字体，进程内只执行一次"""
+    global _FONT_READY
+    if _FONT_READY:
+        return
     system = platform.system()
     if system == 'Windows':
         font_path = 'C:/Windows/Fonts/simhei.ttf'  # 黑体
@@ -25,6 +36,35 @@ def setup_chinese_font():
     
     # 修复负号显示
     plt.rcParams['axes.unicode_minus'] = False
+    _FONT_READY = True
+
+# 保存图片时复用的Figure/Axes (Agg画布，与pyplot的后端和图形管理无关)
+_FIGURE: Optional[Figure] = None
+_AXES: Optional[Axes] = None
+
+def _new_axes(save_path: Optional[str]) -> Tuple[Figure, Axes]:
+    """
+    获取绘图用的Figure和Axes
+
+    保存图片时复用模块级的Figure (清空后重画)，免去每张图重新创建画布、坐标轴和变换；
+    需要显示时才通过pyplot创建新窗口。
+
+    参数:
+        save_path: 保存图片的路径，为None时表示显示图表
+
+    返回:
+        (Figure, Axes)
+    """
+    global _FIGURE, _AXES
+    if not save_path:
+        return plt.subplots(figsize=(10, 6))
+    if _FIGURE is None:
+        _FIGURE = Figure(figsize=(10, 6))
+        FigureCanvasAgg(_FIGURE)
+        _AXES = _FIGURE.add_subplot()
+    else:
+        _AXES.clear()
+    return _FIGURE, _AXES
 
 def plot_equity_curve(portfolio_values: pd.Series, title: str = "Equity Curve", save_path: Optional[str] = None) -> None:
     """
@@ -42,23 +82,23 @@ def plot_equity_curve(portfolio_values: pd.Series, title: str = "Equity Curve",
     # 设置中文字体
     setup_chinese_font()
     
-    plt.figure(figsize=(10, 6))
-    portfolio_values.plot()
-    plt.title(title)
-    plt.xlabel("日期")
-    plt.ylabel("组合价值")
-    plt.grid(True)
+    fig, ax = _new_axes(save_path)
+    ax.plot(portfolio_values.index.values, portfolio_values.to_numpy())
+    ax.set_title(title)
+    ax.set_xlabel("日期")
+    ax.set_ylabel("组合价值")
+    ax.grid(True)
     
     # 如果只有两个数据点，标记起点和终点
     if len(portfolio_values) <= 2:
-        plt.scatter(portfolio_values.index, portfolio_values.values, color='red')
+        ax.scatter(portfolio_values.index, portfolio_values.values, color='red')
         for i, (date, value) in enumerate(zip(portfolio_values.index, portfolio_values.values)):
             label = "初始" if i == 0 else "最终"
-            plt.annotate(f"{label}: {value:.2f}", (date, value), xytext=(10, 10), 
-                         textcoords='offset points')
+            ax.annotate(f"{label}: {value:.2f}", (date, value), xytext=(10, 10), 
+                        textcoords='offset points')
     
     if save_path:
-        plt.savefig(save_path, dpi=300)
+        fig.savefig(save_path, dpi=150)
         print(f"Equity curve saved to {save_path}")
     else:
         plt.show()
@@ -83,43 +123,87 @@ def plot_drawdown(portfolio_values: pd.Series, title: str = "Drawdown", save_pat
         print("Cannot calculate drawdown: need at least 2 data points.")
         return
         
-    # 计算回撤
-    cumulative_max = portfolio_values.cummax()
-    drawdown = (portfolio_values - cumulative_max) / cumulative_max
+    # 计算回撤 (fmax累积与cummax一样跳过NaN，NaN处的回撤仍为NaN)
+    values = portfolio_values.to_numpy(dtype=np.float64)
+    cumulative_max = np.fmax.accumulate(values)
+    drawdown = pd.Series((values - cumulative_max) / cumulative_max, index=portfolio_values.index)
     
-    plt.figure(figsize=(10, 6))
-    drawdown.plot(kind='area', color='red', alpha=0.3)
-    plt.title(title)
-    plt.xlabel("日期")
-    plt.ylabel("回撤")
-    plt.grid(True)
+    fig, ax = _new_axes(save_path)
+    ax.fill_between(drawdown.index.values, drawdown.to_numpy(), 0, color='red', alpha=0.3)
+    ax.set_title(title)
+    ax.set_xlabel("日期")
+    ax.set_ylabel("回撤")
+    ax.grid(True)
     
     # 标记最大回撤点
     max_dd_idx = drawdown.idxmin()
     if not pd.isna(max_dd_idx):
         max_dd = drawdown[max_dd_idx]
-        plt.scatter([max_dd_idx], [max_dd], color='blue', zorder=5)
-        plt.annotate(f"最大回撤: {max_dd:.2%}", (max_dd_idx, max_dd), 
-                     xytext=(10, 10), textcoords='offset points')
+        ax.scatter([max_dd_idx], [max_dd], color='blue', zorder=5)
+        ax.annotate(f"最大回撤: {max_dd:.2%}", (max_dd_idx, max_dd), 
+                    xytext=(10, 10), textcoords='offset points')
     
     if save_path:
-        plt.savefig(save_path, dpi=300)
+        fig.savefig(save_path, dpi=150)
         print(f"Drawdown plot saved to {save_path}")
     else:
         plt.show()
 
+def _write_figure(fig: Any, path: str) -> Optional[str]:
+    """
+    将plotly图表导出为图片 (在导出进程中执行)
+
+    参数:
+        fig: plotly Figure
+        path: 图片路径
+
+    返回:
+        出错时的错误信息，成功时为None
+    """
+    try:
+        fig.write_image(path)
+    except Exception as e:
+        return str(e)
+    return None
+
+def _write_figures(exports: List[Tuple[str, Any, str]], max_workers: Optional[int] = None) -> None:
+    """
+    导出多张plotly图表，图表之间互不依赖，多于一张时分到多个进程同时导出
+
+    参数:
+        exports: (图表说明, plotly Figure, 图片路径) 列表
+        max_workers: 导出进程数上限，None表示使用全部CPU；为1时在当前进程中依次导出
+    """
+    n_workers = min(len(exports), max_workers or os.cpu_count() or 1)
+    figures = [fig for _, fig, _ in exports]
+    paths = [path for _, _, path in exports]
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            errors = list(executor.map(_write_figure, figures, paths))
+    else:
+        errors = [_write_figure(fig, path) for fig, path in zip(figures, paths)]
+    for (label, _, _), error in zip(exports, errors):
+        if error is not None:
+            print(f"Could not save {label}: {error}")
+
 def plot_optimization_results(study: 'optuna.study.Study', 
                              param_names: List[str], 
                              metric_name: str = "Sharpe Ratio", 
-                             save_path: Optional[str] = None) -> None:
+                             save_path: Optional[str] = None,
+                             max_workers: Optional[int] = None) -> None:
     """
     绘制优化结果 (例如，参数与目标指标的关系图)
+
+    图表在当前进程中生成；给出 save_path 时只保存不显示 (批量运行时不打开浏览器)，
+    各图表并行导出，否则逐个显示。
     
     参数:
         study: Optuna study对象
         param_names: 要绘制的参数名称列表
         metric_name: 指标名称
         save_path: 可选，保存图片的路径
+        max_workers: 并行导出图片的进程数上限，None表示使用全部CPU
+                     (在已占满CPU的并行worker中调用时应传入1，依次导出)
     """
     try:
         import optuna.visualization as vis
@@ -131,21 +215,26 @@ def plot_optimization_results(study: 'optuna.study.Study',
         print("No trials to plot for optimization results.")
         return
 
+    # 待导出的图表: (说明, 图表, 路径)
+    exports: List[Tuple[str, Any, str]] = []
+
     # Plot parameter importance
     try:
         fig_importance = vis.plot_param_importances(study)
-        fig_importance.show()
         if save_path:
-            fig_importance.write_image(save_path.replace('.png', '_importance.png'))
+            exports.append(("parameter importance", fig_importance, save_path.replace('.png', '_importance.png')))
+        else:
+            fig_importance.show()
     except Exception as e:
         print(f"Could not plot parameter importance: {e}")
 
     # Plot optimization history
     try:
         fig_history = vis.plot_optimization_history(study)
-        fig_history.show()
         if save_path:
-            fig_history.write_image(save_path.replace('.png', '_history.png'))
+            exports.append(("optimization history", fig_history, save_path.replace('.png', '_history.png')))
+        else:
+            fig_history.show()
     except Exception as e:
         print(f"Could not plot optimization history: {e}")
 
@@ -153,12 +242,16 @@ def plot_optimization_results(study: 'optuna.study.Study',
     for param_name in param_names:
         try:
             fig_slice = vis.plot_slice(study, params=[param_name])
-            fig_slice.show()
             if save_path:
-                fig_slice.write_image(save_path.replace('.png', f'_slice_{param_name}.png'))
+                exports.append((f"slice for {param_name}", fig_slice, save_path.replace('.png', f'_slice_{param_name}.png')))
+            else:
+                fig_slice.show()
         except Exception as e:
             print(f"Could not plot slice for {param_name}: {e}")
 
+    if exports:
+        _write_figures(exports, max_workers)
+
     if save_path:
         print(f"Optimization plots saved near {save_path}")
 